@@ -2,23 +2,47 @@
 Flask Backend for CV Optimizer - Agent-based architecture
 Uses LangGraph for CV optimization and ReAct for assistant
 """
-from flask import Flask, render_template, request, jsonify, send_file
+# Monkey-patch before any other import so sockets/SSL become cooperative:
+# endpoints spend most of their wall time waiting on OpenAI, and gevent
+# lets those waits overlap within a single worker
+# (run with: gunicorn -k gevent -w 4 --worker-connections 100 app:app)
+try:
+    from gevent import monkey
+    monkey.patch_all()
+except ImportError:
+    pass
+
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
 import os
-import traceback
+import json
+import threading
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement depuis .env
 load_dotenv()
+
+# The process-level LLM cache (SQLite, tunable via LLM_CACHE_PATH) is
+# installed by utils.llm_client on first import below
+from utils.api_helpers import allowed_file, openai_error_payload, ALLOWED_EXTENSIONS
+from utils.hashing import content_hash
 from utils.pdf_parser import extract_text_from_pdf
-from utils.cv_optimizer_agent import optimize_cv_with_agent
+from utils.cv_optimizer_agent import optimize_cv_with_agent, stream_cv_optimization
 from utils.letter_generator import generate_cover_letter, parse_openai_error
 from utils.skills_matcher import extract_skills, match_skills
-from utils.assistant_agent import process_assistant_request_with_agent
+from utils.assistant_agent import process_assistant_request_with_agent, stream_assistant_request
 from utils.pdf_generator import generate_harvard_pdf
 from utils.rag_system import RAGSystem
+from utils.semantic_cache import SemanticCache
 from utils.langfuse_config import init_langfuse_client
 
+try:
+    from langchain.memory import ConversationBufferWindowMemory
+except ImportError:
+    ConversationBufferWindowMemory = None
+
 try:
     from langchain.memory import ConversationBufferMemory
 except ImportError:
@@ -57,25 +81,182 @@ except ImportError:
                 self.return_messages = return_messages
                 self.chat_memory = SimpleChatMemory()
 
+# orjson-backed JSON provider: SIMD-accelerated C encode/decode is several
+# times faster than stdlib json on the large CV/skills payloads we move
+try:
+    import orjson
+    from flask.json.provider import JSONProvider
+
+    class ORJSONProvider(JSONProvider):
+        def dumps(self, obj, **kwargs):
+            # OPT_SERIALIZE_NUMPY: skills payloads carry numpy scalars
+            # (e.g. avg_similarity) that stdlib json accepted but orjson
+            # rejects by default
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
 CORS(app)
 
+# Compress JSON/PDF responses: optimized CVs and skills payloads shrink
+# 5-10x over the wire, which dominates latency for remote clients
+try:
+    from flask_compress import Compress
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'application/pdf', 'text/html']
+    app.config['COMPRESS_LEVEL'] = 5
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    Compress(app)
+except ImportError:
+    pass
+
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-ALLOWED_EXTENSIONS = {'pdf', 'txt'}
+
+# Reject oversize bodies at the WSGI boundary: werkzeug aborts with 413
+# before the body is read, so over-limit bytes are never buffered
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# In-memory storage for assistant conversation history
-assistant_memory = {}  # {session_id: ConversationBufferMemory}
 
-# In-memory storage for RAG systems
-rag_systems = {}  # {session_id: RAGSystem}
+@app.errorhandler(RequestEntityTooLarge)
+def handle_request_too_large(e):
+    """Return JSON (instead of an HTML error page) for oversize bodies."""
+    return jsonify({
+        'error': f'File too large. Maximum size is {MAX_FILE_SIZE / 1024 / 1024}MB'
+    }), 413
+
+# Session stores are bounded (LRU + TTL) so long-running processes don't
+# leak one ConversationBufferMemory + RAGSystem per browser tab forever
+SESSION_CACHE_MAXSIZE = 1000
+SESSION_CACHE_TTL = 3600  # seconds
+
+try:
+    from cachetools import TTLCache
+    # In-memory storage for assistant conversation history
+    assistant_memory = TTLCache(maxsize=SESSION_CACHE_MAXSIZE, ttl=SESSION_CACHE_TTL)  # {session_id: ConversationBufferMemory}
+    # In-memory storage for RAG systems
+    rag_systems = TTLCache(maxsize=SESSION_CACHE_MAXSIZE, ttl=SESSION_CACHE_TTL)  # {session_id: RAGSystem}
+except ImportError:
+    # Fallback: unbounded dicts (original behavior)
+    assistant_memory = {}
+    rag_systems = {}
+
+# Guard get-or-create on the session dicts: with gevent or a threaded
+# server, two requests for the same new session_id can interleave
+sessions_lock = threading.Lock()
+
+# Client-side throttle: cap concurrent OpenAI work per API key so a burst of
+# requests doesn't trip 429s whose retries pile further load on the account.
+# ChatOpenAI already retries rate-limit errors with exponential backoff, so
+# gating concurrency is enough to keep throughput predictable.
+MAX_CONCURRENT_LLM_REQUESTS_PER_KEY = int(os.getenv("MAX_CONCURRENT_LLM_REQUESTS_PER_KEY", "8"))
+# Bounded (FIFO) like the session stores: the keys are user-supplied, and a
+# semaphore for an evicted key is cheap to recreate
+LLM_GATES_MAX_ENTRIES = 1024
+_llm_gates = {}
+_llm_gates_lock = threading.Lock()
+
 
+def llm_gate(api_key):
+    """Get the shared semaphore gating OpenAI calls for this API key."""
+    with _llm_gates_lock:
+        gate = _llm_gates.get(api_key)
+        if gate is None:
+            if len(_llm_gates) >= LLM_GATES_MAX_ENTRIES:
+                _llm_gates.pop(next(iter(_llm_gates)))
+            gate = threading.BoundedSemaphore(MAX_CONCURRENT_LLM_REQUESTS_PER_KEY)
+            _llm_gates[api_key] = gate
+        return gate
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+# Optional Redis backing for assistant memory: survives worker restarts and
+# is shared across gunicorn workers, so history built in one worker is not
+# lost when the next request lands on another
+REDIS_URL = os.getenv("REDIS_URL")
+
+try:
+    from langchain_community.chat_message_histories import RedisChatMessageHistory
+except ImportError:
+    RedisChatMessageHistory = None
+
+
+# Keep the agent prompt bounded: at most this many *messages* of history are
+# serialized into it each turn — the same env var and unit the assistant's
+# manual history slices use. ConversationBufferWindowMemory's k counts
+# exchanges (human + AI pairs), hence the // 2 below.
+ASSISTANT_HISTORY_WINDOW = int(os.getenv("ASSISTANT_HISTORY_WINDOW", "10"))
+
+
+def create_session_memory(session_id):
+    """Create conversation memory for a session, Redis-backed when configured.
+
+    Windowed to the last ASSISTANT_HISTORY_WINDOW exchanges so the agent
+    does not re-serialize the full conversation into every prompt.
+    """
+    if ConversationBufferWindowMemory is not None:
+        memory_cls = ConversationBufferWindowMemory
+        memory_kwargs = {"k": max(1, ASSISTANT_HISTORY_WINDOW // 2)}
+    else:
+        memory_cls = ConversationBufferMemory
+        memory_kwargs = {}
+    if REDIS_URL and RedisChatMessageHistory is not None:
+        try:
+            return memory_cls(
+                memory_key="chat_history",
+                return_messages=True,
+                chat_memory=RedisChatMessageHistory(
+                    session_id=session_id,
+                    url=REDIS_URL,
+                    ttl=SESSION_CACHE_TTL
+                ),
+                **memory_kwargs
+            )
+        except Exception as e:
+            print(f"Warning: Redis memory unavailable, using in-process memory: {str(e)}")
+    return memory_cls(
+        memory_key="chat_history",
+        return_messages=True,
+        **memory_kwargs
+    )
+
+
+# In-process response cache for deterministic requests: the same payload
+# (excluding api_key) short-circuits the agent entirely on a hit.
+# Only low-temperature requests are cached, since high temperatures are
+# expected to produce different output on each call.
+response_cache = {}  # {payload_hash: response_dict}
+RESPONSE_CACHE_MAX_ENTRIES = 256
+CACHEABLE_TEMPERATURE = 0.3
+
+# Semantic cache tier below the exact-key cache: near-duplicate
+# (CV, job description) pairs reuse the cached optimization result
+semantic_cache = SemanticCache(similarity_threshold=0.97)
+
+
+def response_cache_key(payload):
+    """Compute a deterministic cache key from a JSON-serializable payload."""
+    if ORJSON_AVAILABLE:
+        serialized = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    else:
+        serialized = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return content_hash(serialized)
+
+
+def response_cache_set(key, value):
+    """Store a response, evicting the oldest entry when the cache is full."""
+    if len(response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+        response_cache.pop(next(iter(response_cache)))
+    response_cache[key] = value
 
 
 @app.route('/')
@@ -112,33 +293,73 @@ def api_optimize_cv():
             max_date_years = int(max_date_years)
         language = data.get('language', 'fr')
         session_id = data.get('session_id', 'default')
-        
+        use_structure_analysis = bool(data.get('use_structure_analysis', False))
+
+        # Short-circuit on identical deterministic requests
+        cache_key = None
+        if temperature <= CACHEABLE_TEMPERATURE:
+            cache_key = response_cache_key({
+                'endpoint': 'optimize-cv',
+                'cv_text': cv_text,
+                'job_description': job_description,
+                'model': model,
+                'temperature': temperature,
+                'min_experiences': min_experiences,
+                'max_experiences': max_experiences,
+                'max_date_years': max_date_years,
+                'language': language,
+                'use_structure_analysis': use_structure_analysis
+            })
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached)
+
+        # Second tier: semantic lookup for near-duplicate CV/JD pairs
+        semantic_params_key = None
+        if temperature <= CACHEABLE_TEMPERATURE:
+            semantic_params_key = response_cache_key({
+                'endpoint': 'optimize-cv',
+                'model': model,
+                'temperature': temperature,
+                'min_experiences': min_experiences,
+                'max_experiences': max_experiences,
+                'max_date_years': max_date_years,
+                'language': language,
+                'use_structure_analysis': use_structure_analysis
+            })
+            cached = semantic_cache.lookup(cv_text, job_description, semantic_params_key, api_key)
+            if cached is not None:
+                return jsonify(cached)
+
         # Get or create RAG system for this session
-        if session_id not in rag_systems:
-            try:
-                rag_systems[session_id] = RAGSystem(api_key=api_key)
-            except Exception as e:
-                return jsonify({
-                    'error': f'Error initializing RAG system: {str(e)}',
-                    'agent_logs': []
-                }), 500
-        
+        try:
+            with sessions_lock:
+                if session_id not in rag_systems:
+                    rag_systems[session_id] = RAGSystem(api_key=api_key)
+        except Exception as e:
+            return jsonify({
+                'error': f'Error initializing RAG system: {str(e)}',
+                'agent_logs': []
+            }), 500
+
         rag_system = rag_systems[session_id]
         
         # Use agent-based optimization with RAG
-        result = optimize_cv_with_agent(
-            cv_text=cv_text,
-            job_description=job_description,
-            api_key=api_key,
-            model=model,
-            temperature=temperature,
-            min_experiences=min_experiences,
-            max_experiences=max_experiences,
-            max_date_years=max_date_years,
-            language=language,
-            rag_system=rag_system,  # Pass RAG system to agent
-            session_id=session_id  # Pass session_id for Langfuse
-        )
+        with llm_gate(api_key):
+            result = optimize_cv_with_agent(
+                cv_text=cv_text,
+                job_description=job_description,
+                api_key=api_key,
+                model=model,
+                temperature=temperature,
+                min_experiences=min_experiences,
+                max_experiences=max_experiences,
+                max_date_years=max_date_years,
+                language=language,
+                rag_system=rag_system,  # Pass RAG system to agent
+                session_id=session_id,  # Pass session_id for Langfuse
+                use_structure_analysis=use_structure_analysis
+            )
         
         if result.get('error'):
             error_info = parse_openai_error(Exception(result['error']))
@@ -148,7 +369,7 @@ def api_optimize_cv():
                 'agent_logs': result.get('agent_logs', [])
             }), 500
         
-        return jsonify({
+        response_payload = {
             'optimized_cv': result.get('optimized_cv'),
             'agent_logs': result.get('agent_logs', []),
             'cv_skills': result.get('cv_skills', []),
@@ -159,15 +380,85 @@ def api_optimize_cv():
             'graph_structure': result.get('graph_structure'),  # NEW: Return graph structure for visualization
             'model_used': result.get('model_used', model),
             'word_count': result.get('word_count', 0)
-        })
-        
+        }
+        if cache_key:
+            response_cache_set(cache_key, response_payload)
+        if semantic_params_key:
+            semantic_cache.store(cv_text, job_description, semantic_params_key, api_key, response_payload)
+        return jsonify(response_payload)
+
     except Exception as e:
-        error_info = parse_openai_error(e)
-        return jsonify({
-            'error': error_info['user_message'],
-            'error_code': error_info.get('error_code'),
-            'error_details': str(e)
-        }), 500
+        return jsonify(openai_error_payload(e, error_details=str(e))), 500
+
+
+@app.route('/api/optimize-cv/stream', methods=['POST'])
+def api_optimize_cv_stream():
+    """API endpoint to optimize CV with NDJSON progress streaming"""
+    # Pre-stream setup returns the same JSON error envelope as the blocking
+    # endpoint; only errors after streaming starts go through NDJSON events
+    try:
+        data = request.json
+
+        cv_text = data.get('cv_text', '')
+        job_description = data.get('job_description', '')
+        api_key = data.get('api_key', '')
+
+        if not api_key:
+            return jsonify({'error': 'API key is required'}), 400
+
+        if not cv_text or not job_description:
+            return jsonify({'error': 'CV text and job description are required'}), 400
+
+        model = data.get('model', 'gpt-4o-mini')
+        temperature = float(data.get('temperature', 0.3))
+        min_experiences = int(data.get('min_experiences', 3))
+        max_experiences = int(data.get('max_experiences', 8))
+        max_date_years = data.get('max_date_years')
+        if max_date_years:
+            max_date_years = int(max_date_years)
+        language = data.get('language', 'fr')
+        session_id = data.get('session_id', 'default')
+        use_structure_analysis = bool(data.get('use_structure_analysis', False))
+
+        # Get or create RAG system for this session
+        try:
+            with sessions_lock:
+                if session_id not in rag_systems:
+                    rag_systems[session_id] = RAGSystem(api_key=api_key)
+        except Exception as e:
+            return jsonify({
+                'error': f'Error initializing RAG system: {str(e)}',
+                'agent_logs': []
+            }), 500
+
+        rag_system = rag_systems[session_id]
+    except Exception as e:
+        return jsonify(openai_error_payload(e, error_details=str(e))), 500
+
+    def generate():
+        # One NDJSON line per event so the client can render progress and
+        # the partial CV while later nodes are still running
+        with llm_gate(api_key):
+            for event in stream_cv_optimization(
+                cv_text=cv_text,
+                job_description=job_description,
+                api_key=api_key,
+                model=model,
+                temperature=temperature,
+                min_experiences=min_experiences,
+                max_experiences=max_experiences,
+                max_date_years=max_date_years,
+                language=language,
+                rag_system=rag_system,
+                session_id=session_id,
+                use_structure_analysis=use_structure_analysis
+            ):
+                if ORJSON_AVAILABLE:
+                    yield orjson.dumps(event, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n'
+                else:
+                    yield json.dumps(event) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 @app.route('/api/generate-letter', methods=['POST'])
@@ -191,17 +482,35 @@ def api_generate_letter():
         temperature = float(data.get('temperature', 0.7))
         target_words = int(data.get('letter_words', 300))
         language = data.get('language', 'fr')
-        
-        result = generate_cover_letter(
-            cv_text=cv_text,
-            optimized_cv=optimized_cv or cv_text,
-            job_description=job_description,
-            api_key=api_key,
-            model=model,
-            temperature=temperature,
-            target_words=target_words,
-            language=language
-        )
+
+        # Short-circuit on identical deterministic requests
+        cache_key = None
+        if temperature <= CACHEABLE_TEMPERATURE:
+            cache_key = response_cache_key({
+                'endpoint': 'generate-letter',
+                'cv_text': cv_text,
+                'optimized_cv': optimized_cv,
+                'job_description': job_description,
+                'model': model,
+                'temperature': temperature,
+                'target_words': target_words,
+                'language': language
+            })
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached)
+
+        with llm_gate(api_key):
+            result = generate_cover_letter(
+                cv_text=cv_text,
+                optimized_cv=optimized_cv or cv_text,
+                job_description=job_description,
+                api_key=api_key,
+                model=model,
+                temperature=temperature,
+                target_words=target_words,
+                language=language
+            )
         
         if result.get('error'):
             return jsonify({
@@ -209,19 +518,18 @@ def api_generate_letter():
                 'error_code': result.get('error_code')
             }), 500
         
-        return jsonify({
+        response_payload = {
             'cover_letter': result.get('cover_letter'),
             'word_count': result.get('word_count', 0),
             'target_words': result.get('target_words', target_words),
             'model_used': result.get('model_used', model)
-        })
+        }
+        if cache_key:
+            response_cache_set(cache_key, response_payload)
+        return jsonify(response_payload)
         
     except Exception as e:
-        error_info = parse_openai_error(e)
-        return jsonify({
-            'error': error_info['user_message'],
-            'error_code': error_info.get('error_code')
-        }), 500
+        return jsonify(openai_error_payload(e)), 500
 
 
 @app.route('/api/extract-skills', methods=['POST'])
@@ -241,14 +549,29 @@ def api_extract_skills():
         
         if not text:
             return jsonify({'error': 'Text is required'}), 400
-        
-        result = extract_skills(
-            text=text,
-            text_type=text_type,
-            api_key=api_key,
-            model=model,
-            temperature=temperature
-        )
+
+        # Short-circuit on identical deterministic requests
+        cache_key = None
+        if temperature <= CACHEABLE_TEMPERATURE:
+            cache_key = response_cache_key({
+                'endpoint': 'extract-skills',
+                'text': text,
+                'text_type': text_type,
+                'model': model,
+                'temperature': temperature
+            })
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached)
+
+        with llm_gate(api_key):
+            result = extract_skills(
+                text=text,
+                text_type=text_type,
+                api_key=api_key,
+                model=model,
+                temperature=temperature
+            )
         
         if result.get('status') == 'error':
             return jsonify({
@@ -256,18 +579,16 @@ def api_extract_skills():
                 'skills': []
             }), 500
         
-        return jsonify({
+        response_payload = {
             'skills': result.get('skills', []),
             'count': result.get('count', 0)
-        })
+        }
+        if cache_key:
+            response_cache_set(cache_key, response_payload)
+        return jsonify(response_payload)
         
     except Exception as e:
-        error_info = parse_openai_error(e)
-        return jsonify({
-            'error': error_info['user_message'],
-            'error_code': error_info.get('error_code'),
-            'skills': []
-        }), 500
+        return jsonify(openai_error_payload(e, skills=[])), 500
 
 
 @app.route('/api/match-skills', methods=['POST'])
@@ -289,16 +610,33 @@ def api_match_skills():
         
         if not cv_skills or not job_skills:
             return jsonify({'error': 'Both CV skills and job skills are required'}), 400
-        
-        result = match_skills(
-            cv_skills=cv_skills,
-            job_skills=job_skills,
-            api_key=api_key,
-            cv_text=cv_text,
-            job_text=job_text,
-            model=model,
-            temperature=temperature
-        )
+
+        # Short-circuit on identical deterministic requests
+        cache_key = None
+        if temperature <= CACHEABLE_TEMPERATURE:
+            cache_key = response_cache_key({
+                'endpoint': 'match-skills',
+                'cv_skills': cv_skills,
+                'job_skills': job_skills,
+                'cv_text': cv_text,
+                'job_text': job_text,
+                'model': model,
+                'temperature': temperature
+            })
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached)
+
+        with llm_gate(api_key):
+            result = match_skills(
+                cv_skills=cv_skills,
+                job_skills=job_skills,
+                api_key=api_key,
+                cv_text=cv_text,
+                job_text=job_text,
+                model=model,
+                temperature=temperature
+            )
         
         if result.get('status') == 'error':
             return jsonify({
@@ -309,20 +647,19 @@ def api_match_skills():
                 'interesting': []
             }), 500
         
-        return jsonify({
+        response_payload = {
             'matched': result.get('matched', []),
             'cv_only': result.get('cv_only', []),
             'job_only': result.get('job_only', []),
             'interesting': result.get('interesting', []),
             'stats': result.get('stats', {})
-        })
+        }
+        if cache_key:
+            response_cache_set(cache_key, response_payload)
+        return jsonify(response_payload)
         
     except Exception as e:
-        error_info = parse_openai_error(e)
-        return jsonify({
-            'error': error_info['user_message'],
-            'error_code': error_info.get('error_code')
-        }), 500
+        return jsonify(openai_error_payload(e)), 500
 
 
 @app.route('/api/assistant', methods=['POST'])
@@ -354,41 +691,40 @@ def api_assistant():
             return jsonify({'error': 'Optimized CV is required'}), 400
         
         # Get or create memory for this session
-        if session_id not in assistant_memory:
-            assistant_memory[session_id] = ConversationBufferMemory(
-                memory_key="chat_history",
-                return_messages=True
-            )
-        
-        memory = assistant_memory[session_id]
-        
-        # Get or create RAG system for this session
-        if session_id not in rag_systems:
-            try:
-                rag_systems[session_id] = RAGSystem(api_key=api_key)
-            except Exception as e:
-                print(f"Warning: Could not initialize RAG system for session {session_id}: {str(e)}")
-                rag_systems[session_id] = None
-        
+        with sessions_lock:
+            if session_id not in assistant_memory:
+                assistant_memory[session_id] = create_session_memory(session_id)
+
+            memory = assistant_memory[session_id]
+
+            # Get or create RAG system for this session
+            if session_id not in rag_systems:
+                try:
+                    rag_systems[session_id] = RAGSystem(api_key=api_key)
+                except Exception as e:
+                    print(f"Warning: Could not initialize RAG system for session {session_id}: {str(e)}")
+                    rag_systems[session_id] = None
+
         rag_system = rag_systems.get(session_id)
         
         # Use agent-based assistant with RAG
-        result = process_assistant_request_with_agent(
-            user_request=user_request,
-            original_cv=original_cv,
-            optimized_cv=optimized_cv,
-            job_description=job_description,
-            cv_skills=cv_skills,
-            job_skills=job_skills,
-            matched_skills=matched_skills,
-            api_key=api_key,
-            model=model,
-            temperature=temperature,
-            language=language,
-            memory=memory,
-            rag_system=rag_system,  # NEW: Pass RAG system
-            session_id=session_id  # Pass session_id for Langfuse
-        )
+        with llm_gate(api_key):
+            result = process_assistant_request_with_agent(
+                user_request=user_request,
+                original_cv=original_cv,
+                optimized_cv=optimized_cv,
+                job_description=job_description,
+                cv_skills=cv_skills,
+                job_skills=job_skills,
+                matched_skills=matched_skills,
+                api_key=api_key,
+                model=model,
+                temperature=temperature,
+                language=language,
+                memory=memory,
+                rag_system=rag_system,  # NEW: Pass RAG system
+                session_id=session_id  # Pass session_id for Langfuse
+            )
         
         if result.get('error'):
             return jsonify({
@@ -408,14 +744,94 @@ def api_assistant():
         })
         
     except Exception as e:
-        error_info = parse_openai_error(e)
-        return jsonify({
-            'success': False,
-            'error': error_info['user_message'],
-            'error_code': error_info.get('error_code'),
-            'updated_cv': data.get('optimized_cv', ''),
-            'explanation': None
-        }), 500
+        return jsonify(openai_error_payload(
+            e,
+            success=False,
+            updated_cv=data.get('optimized_cv', ''),
+            explanation=None
+        )), 500
+
+
+@app.route('/api/assistant/stream', methods=['POST'])
+def api_assistant_stream():
+    """Streaming assistant endpoint: NDJSON progress events, then the result"""
+    # Pre-stream setup returns the same JSON error envelope as the blocking
+    # endpoint; only errors after streaming starts go through NDJSON events
+    data = None
+    try:
+        data = request.json
+
+        user_request = data.get('request', '')
+        original_cv = data.get('original_cv', '')
+        optimized_cv = data.get('optimized_cv', '')
+        job_description = data.get('job_description', '')
+        cv_skills = data.get('cv_skills', [])
+        job_skills = data.get('job_skills', [])
+        matched_skills = data.get('matched_skills', {})
+        api_key = data.get('api_key', '')
+        session_id = data.get('session_id', 'default')
+        model = data.get('model', 'gpt-4o-mini')
+        temperature = float(data.get('temperature', 0.7))
+        language = data.get('language', 'fr')
+
+        if not api_key:
+            return jsonify({'error': 'API key is required'}), 400
+
+        if not user_request:
+            return jsonify({'error': 'User request is required'}), 400
+
+        if not optimized_cv:
+            return jsonify({'error': 'Optimized CV is required'}), 400
+
+        # Get or create memory for this session
+        with sessions_lock:
+            if session_id not in assistant_memory:
+                assistant_memory[session_id] = create_session_memory(session_id)
+
+            memory = assistant_memory[session_id]
+
+            if session_id not in rag_systems:
+                try:
+                    rag_systems[session_id] = RAGSystem(api_key=api_key)
+                except Exception as e:
+                    print(f"Warning: Could not initialize RAG system for session {session_id}: {str(e)}")
+                    rag_systems[session_id] = None
+
+        rag_system = rag_systems.get(session_id)
+    except Exception as e:
+        return jsonify(openai_error_payload(
+            e,
+            success=False,
+            updated_cv=data.get('optimized_cv', '') if isinstance(data, dict) else '',
+            explanation=None
+        )), 500
+
+    def generate():
+        # One NDJSON line per agent step so the client can show progress
+        # while later tool calls are still running
+        with llm_gate(api_key):
+            for event in stream_assistant_request(
+                user_request=user_request,
+                original_cv=original_cv,
+                optimized_cv=optimized_cv,
+                job_description=job_description,
+                cv_skills=cv_skills,
+                job_skills=job_skills,
+                matched_skills=matched_skills,
+                api_key=api_key,
+                model=model,
+                temperature=temperature,
+                language=language,
+                memory=memory,
+                rag_system=rag_system,
+                session_id=session_id
+            ):
+                if ORJSON_AVAILABLE:
+                    yield orjson.dumps(event, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n'
+                else:
+                    yield json.dumps(event) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 @app.route('/api/upload', methods=['POST'])
@@ -429,30 +845,39 @@ def api_upload():
         
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
-        
-        if not allowed_file(file.filename):
+
+        original_filename = file.filename
+
+        if not allowed_file(original_filename):
             return jsonify({'error': 'File type not allowed. Only PDF and TXT files are supported.'}), 400
-        
-        if file.content_length and file.content_length > MAX_FILE_SIZE:
+
+        # Sanitize only for the response payload: secure_filename strips
+        # non-ASCII characters, so a Cyrillic/CJK name like "резюме.pdf"
+        # would collapse to "pdf" and must not feed the extension gate above
+        filename = secure_filename(original_filename)
+        if '.' not in filename:
+            filename = f"upload.{original_filename.rsplit('.', 1)[1].lower()}"
+        
+        # Read from the werkzeug spooled stream with a hard cap, so an
+        # oversize file is rejected without buffering its full content
+        file_content = file.stream.read(MAX_FILE_SIZE + 1)
+        if len(file_content) > MAX_FILE_SIZE:
             return jsonify({'error': f'File too large. Maximum size is {MAX_FILE_SIZE / 1024 / 1024}MB'}), 400
         
-        # Read file content
-        file_content = file.read()
-        
         # Extract text based on file type
-        if file.filename.lower().endswith('.pdf'):
+        if original_filename.lower().endswith('.pdf'):
             text = extract_text_from_pdf(file_content)
         else:
             text = file_content.decode('utf-8', errors='ignore')
-        
+
         if not text.strip():
             return jsonify({'error': 'Could not extract text from file'}), 400
-        
+
         word_count = len(text.split())
-        
+
         return jsonify({
             'text': text,
-            'filename': file.filename,
+            'filename': filename,
             'size': len(file_content),
             'word_count': word_count
         })
@@ -480,12 +905,19 @@ def api_download_pdf():
             return jsonify({'error': 'CV text is required'}), 400
         
         pdf_buffer = generate_harvard_pdf(cv_text)
-        
-        return send_file(
-            pdf_buffer,
+
+        def stream_pdf(buffer, chunk_size=64 * 1024):
+            """Yield the PDF in chunks instead of one monolithic body."""
+            while True:
+                chunk = buffer.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+        return Response(
+            stream_with_context(stream_pdf(pdf_buffer)),
             mimetype='application/pdf',
-            as_attachment=True,
-            download_name='optimized_cv.pdf'
+            headers={'Content-Disposition': 'attachment; filename=optimized_cv.pdf'}
         )
         
     except Exception as e:
@@ -494,7 +926,30 @@ def api_download_pdf():
         }), 500
 
 
+def preload():
+    """
+    Warm up heavy lazy initialization so the first request pays no
+    cold-start cost (LangGraph graph compilation, PDF backend load).
+    """
+    try:
+        from utils.cv_optimizer_agent import create_cv_optimization_agent
+        create_cv_optimization_agent()
+    except Exception as e:
+        print(f"Preload warning (agent graph): {e}")
+    try:
+        import fitz  # noqa: F401 - forces the PyMuPDF shared library load
+    except ImportError:
+        pass
+
+
+# Opt-in warm-up on boot, e.g.: PRELOAD=1 gunicorn -k gevent ... app:app
+if os.getenv("PRELOAD") == "1":
+    preload()
+
+
 if __name__ == '__main__':
     # Initialiser Langfuse au démarrage si configuré
     init_langfuse_client()
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    # threaded=True lets the dev server overlap concurrent LLM waits too;
+    # production concurrency comes from gunicorn's gevent workers
+    app.run(debug=True, port=5001, threaded=True)
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Shared helpers for the Flask API endpoints
+Common upload validation and error-envelope construction used by app.py
+"""
+import re
+from typing import Any, Dict
+from utils.letter_generator import parse_openai_error
+
+ALLOWED_EXTENSIONS = {'pdf', 'txt'}
+
+# Precompiled extension check: one regex search per upload instead of
+# rsplit + slice + lower allocations
+_ALLOWED_EXTENSION_RE = re.compile(
+    r'\.(' + '|'.join(sorted(ALLOWED_EXTENSIONS)) + r')$',
+    re.IGNORECASE
+)
+
+
+def allowed_file(filename: str) -> bool:
+    """Check whether an uploaded filename has an allowed extension."""
+    return bool(_ALLOWED_EXTENSION_RE.search(filename))
+
+
+def openai_error_payload(error: Exception, **extra) -> Dict[str, Any]:
+    """
+    Build the standard JSON error envelope from an OpenAI/LLM exception.
+
+    Args:
+        error: The exception raised by an LLM call
+        extra: Additional endpoint-specific keys to merge into the payload
+
+    Returns:
+        Dictionary with 'error', 'error_code' and any extra keys
+    """
+    error_info = parse_openai_error(error)
+    payload = {
+        'error': error_info['user_message'],
+        'error_code': error_info.get('error_code'),
+    }
+    payload.update(extra)
+    return payload
@@ -2,28 +2,56 @@
 ReAct Agent for Conversational Assistant
 Uses tools and memory to help users adjust CVs and skills
 """
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import Tool
-from typing import Dict, Any, List, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Dict, Any, List, Optional, Callable, Literal
+import bisect
 import json
+import logging
+import os
+import re
 
+from pydantic import BaseModel, Field
+
+# orjson when available: C-implemented, several times faster than json for
+# the skill lists and tool observations serialized on every agent step
 try:
-    from langchain.agents import AgentExecutor, create_react_agent
-    from langchain import hub
-    HAS_AGENT_EXECUTOR = True
+    import orjson
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
 except ImportError:
-    try:
-        from langchain.agents.agent import AgentExecutor
-        from langchain.agents.react.base import ReActDocstoreAgent
-        HAS_AGENT_EXECUTOR = False
-    except ImportError:
-        HAS_AGENT_EXECUTOR = False
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+# Lazy agent-stack import: langchain.agents (and langchain.hub behind it)
+# costs hundreds of ms of import time per fresh process, paid even when only
+# the fallback path runs. Availability is probed without importing; the real
+# import happens once, on first agent construction.
+try:
+    from importlib.util import find_spec
+    HAS_AGENT_EXECUTOR = find_spec("langchain") is not None
+except (ImportError, ValueError):
+    HAS_AGENT_EXECUTOR = False
+
+
+@cache
+def _agent_imports():
+    """Import (once) and return (AgentExecutor, create_react_agent)."""
+    from langchain.agents import AgentExecutor, create_react_agent
+    return AgentExecutor, create_react_agent
+
+
 try:
-    from langchain.memory import ConversationBufferMemory
+    from langchain.memory import ConversationBufferMemory, ConversationBufferWindowMemory
 except ImportError:
     try:
         from langchain_core.memory import ConversationBufferMemory
+        ConversationBufferWindowMemory = None
     except ImportError:
         # Try to import message types for proper fallback
         try:
@@ -40,16 +68,22 @@ except ImportError:
                     self.content = content
                     self.type = "ai"
         
-        # Simple fallback with proper message types
+        # Simple fallback with proper message types, trimmed to the same
+        # window as the real memory so history cannot grow unboundedly
         class SimpleChatMemory:
             def __init__(self):
                 self.messages = []
-            
+
+            def _trim(self):
+                del self.messages[:-_HISTORY_WINDOW]
+
             def add_user_message(self, msg):
                 self.messages.append(HumanMessage(msg))
-            
+                self._trim()
+
             def add_ai_message(self, msg):
                 self.messages.append(AIMessage(msg))
+                self._trim()
         
         class ConversationBufferMemory:
             def __init__(self, memory_key="chat_history", return_messages=True):
@@ -57,100 +91,692 @@ except ImportError:
                 self.return_messages = return_messages
                 self.chat_memory = SimpleChatMemory()
 
+        ConversationBufferWindowMemory = None
+
 from utils.tools import (
     update_cv_section_tool,
     search_cv_content_tool,
-    extract_skills_tool,
-    compare_skills_tool
+    batch_extract_skills_tool,
+    cached_extract_skills,
+    compare_skills_tool,
+    extract_skills_tool
 )
 from utils.langfuse_config import create_langfuse_callback
+from utils.llm_client import get_chat_model
+
+
+# Cap on ReAct iterations; each one is a full LLM round-trip, so this bounds
+# worst-case latency for pathological requests
+_MAX_AGENT_ITERATIONS = int(os.getenv("ASSISTANT_MAX_ITERATIONS", "10"))
+
+# Agent step-by-step tracing is opt-in: verbose=True prints every
+# thought/action synchronously, which serializes threads on stdout under load
+_VERBOSE = os.getenv("AGENT_VERBOSE", "0") == "1"
 
+# Keep only the last N *messages* in prompts: an unbounded buffer
+# re-serializes the whole conversation every turn and grows token cost
+# linearly with turns. ConversationBufferWindowMemory counts exchanges
+# (human + AI pairs), so window memories use _HISTORY_WINDOW // 2 as k.
+_HISTORY_WINDOW = int(os.getenv("ASSISTANT_HISTORY_WINDOW", "10"))
 
-def create_assistant_tools(api_key: str, optimized_cv: str) -> tuple[List[Tool], Callable[[], str]]:
+logger = logging.getLogger(__name__)
+
+class _CvHolder:
+    """Mutable current-CV cell shared between tool closures.
+
+    A slotted attribute reads/writes with a single LOAD_ATTR/STORE_ATTR
+    and costs ~48 bytes, versus the subscript and bounds check of the
+    previous one-element-list idiom.
+    """
+    __slots__ = ("cv",)
+
+    def __init__(self, cv: str):
+        self.cv = cv
+
+
+def _default_memory():
+    """Fresh conversation memory, windowed so prompt size stays bounded."""
+    if ConversationBufferWindowMemory is not None:
+        return ConversationBufferWindowMemory(
+            k=max(1, _HISTORY_WINDOW // 2),
+            memory_key="chat_history",
+            return_messages=True
+        )
+    return ConversationBufferMemory(
+        memory_key="chat_history",
+        return_messages=True
+    )
+
+
+def create_assistant_tools(api_key: str, optimized_cv: str, rag_system: Optional[Any] = None) -> tuple[List[Tool], Callable[[], str]]:
     """Create tools for the assistant agent, bound with API key and current CV.
-    
+
+    Args:
+        rag_system: Optional RAG system; when given, a search_context tool is
+            exposed so the agent retrieves semantic context only when needed
+
     Returns:
         Tuple of (tools_list, get_current_cv_function)
     """
     
+    # Per-request handle registry: tools exchange short opaque handles instead
+    # of round-tripping full skill lists (often hundreds of strings) through
+    # the LLM context, where they cost tokens and risk being corrupted
+    handles: Dict[str, List[str]] = {}
+
+    def _store_handle(prefix: str, skills: List[str]) -> str:
+        handle = f"{prefix}_{len(handles)}"
+        handles[handle] = skills
+        return handle
+
+    def _resolve_skills(data: Any) -> List[str]:
+        """Resolve a tool input to a skills list: handle, inline dict, or list."""
+        if isinstance(data, dict):
+            handle = data.get("handle")
+            if handle and handle in handles:
+                return handles[handle]
+            # Fall back to inline data (the LLM dropped or invented the handle)
+            return data.get("skills", [])
+        if isinstance(data, list):
+            return data
+        return []
+
     def extract_cv_skills_wrapper(text: str) -> str:
-        result = extract_skills_tool.invoke({"text": text, "text_type": "cv", "api_key": api_key})
-        skills = result.get("skills", [])
-        return json.dumps({"skills": skills, "count": len(skills)})
-    
+        skills = cached_extract_skills(text, "cv", api_key)
+        handle = _store_handle("cv_skills", skills)
+        return _json_dumps({"handle": handle, "count": len(skills)})
+
     def extract_job_skills_wrapper(text: str) -> str:
-        result = extract_skills_tool.invoke({"text": text, "text_type": "job", "api_key": api_key})
-        skills = result.get("skills", [])
-        return json.dumps({"skills": skills, "count": len(skills)})
-    
+        skills = cached_extract_skills(text, "job", api_key)
+        handle = _store_handle("job_skills", skills)
+        return _json_dumps({"handle": handle, "count": len(skills)})
+
+    def extract_all_skills_wrapper(texts_json: str) -> str:
+        """Extract CV and job skills with a single LLM call."""
+        data = _json_loads(texts_json)
+        result = batch_extract_skills_tool.invoke({
+            "cv_text": data.get("cv_text", ""),
+            "job_text": data.get("job_text", ""),
+            "api_key": api_key
+        })
+        if result.get("status") == "error":
+            # Fall back to the two single-text extractions, overlapped
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                cv_future = executor.submit(
+                    extract_skills_tool.invoke,
+                    {"text": data.get("cv_text", ""), "text_type": "cv", "api_key": api_key}
+                )
+                job_future = executor.submit(
+                    extract_skills_tool.invoke,
+                    {"text": data.get("job_text", ""), "text_type": "job", "api_key": api_key}
+                )
+                result = {
+                    "cv_skills": cv_future.result().get("skills", []),
+                    "job_skills": job_future.result().get("skills", [])
+                }
+        cv_skills = result.get("cv_skills", [])
+        job_skills = result.get("job_skills", [])
+        return _json_dumps({
+            "cv_handle": _store_handle("cv_skills", cv_skills),
+            "job_handle": _store_handle("job_skills", job_skills),
+            "cv_count": len(cv_skills),
+            "job_count": len(job_skills)
+        })
+
     def compare_skills_wrapper(cv_skills_json: str, job_skills_json: str) -> str:
-        cv_data = json.loads(cv_skills_json)
-        job_data = json.loads(job_skills_json)
+        cv_data = _json_loads(cv_skills_json)
+        job_data = _json_loads(job_skills_json)
         result = compare_skills_tool.invoke({
-            "cv_skills": cv_data.get("skills", []),
-            "job_skills": job_data.get("skills", []),
+            "cv_skills": _resolve_skills(cv_data),
+            "job_skills": _resolve_skills(job_data),
             "api_key": api_key
         })
-        return json.dumps(result)
+        return _json_dumps(result)
     
     # Store current CV in closure for tools that need it
-    current_cv = [optimized_cv]
+    current_cv = _CvHolder(optimized_cv)
     
     def update_cv_section_wrapper(section: str, content: str) -> str:
         """Update CV section using the current CV."""
         result = update_cv_section_tool.invoke({
-            "cv_text": current_cv[0],
+            "cv_text": current_cv.cv,
             "section_name": section,
             "new_content": content
         })
         # Update current_cv if successful
         if result.get("status") == "success" and "updated_cv" in result:
-            current_cv[0] = result["updated_cv"]
-        return json.dumps(result)
+            current_cv.cv = result["updated_cv"]
+        return _json_dumps(result)
     
     def search_cv_wrapper(search_term: str) -> str:
         """Search in the current CV."""
         result = search_cv_content_tool.invoke({
-            "cv_text": current_cv[0],
+            "cv_text": current_cv.cv,
             "search_term": search_term
         })
-        return json.dumps(result)
+        return _json_dumps(result)
     
     # Function to get current CV (for update after tool calls)
     def get_current_cv() -> str:
-        return current_cv[0]
-    
+        return current_cv.cv
+
+    def search_context_wrapper(query: str) -> str:
+        """Retrieve semantically relevant CV/JD chunks for a query."""
+        result = rag_system.get_context_with_sources(query=query, k_cv=3, k_jd=2)
+        return _json_dumps(result)
+
+    # Guard against the agent looping on an identical call: repeating the
+    # same (tool, input) returns a stop hint instead of re-running the tool,
+    # since every wasted iteration is a full LLM round-trip
+    last_call = [None]
+
+    def _dedupe(tool_name: str, func: Callable) -> Callable:
+        def wrapped(*args):
+            key = (tool_name, args)
+            if last_call[0] == key:
+                return _json_dumps({
+                    "status": "repeat_call",
+                    "message": "You already called this tool with the same input. Do not repeat it - give the Final Answer now."
+                })
+            last_call[0] = key
+            return func(*args)
+        return wrapped
+
     tools = [
         Tool(
             name="update_cv_section",
-            func=update_cv_section_wrapper,
+            func=_dedupe("update_cv_section", update_cv_section_wrapper),
             description="Update a specific section in the CV. Input: section_name (string like 'Experience', 'Skills', 'Certifications', 'Education', 'Summary'), new_content (string with the COMPLETE new section content - this REPLACES the entire section content, so include all items you want to keep). IMPORTANT: To remove text, first use search_cv to find the current section content, then provide new_content with that text removed but ALL other content preserved. Returns JSON with 'updated_cv' (the complete updated CV text) and 'status'. The CV is automatically updated for subsequent operations."
         ),
         Tool(
             name="search_cv",
-            func=search_cv_wrapper,
+            func=_dedupe("search_cv", search_cv_wrapper),
             description="Search for specific content in the current CV. Input: search_term (string to search for). Returns matching lines and locations. The search is performed on the current CV automatically."
         ),
         Tool(
             name="extract_cv_skills",
-            func=extract_cv_skills_wrapper,
-            description="Extract skills from CV text. Input: text (string, the CV text). Returns JSON with skills list and count."
+            func=_dedupe("extract_cv_skills", extract_cv_skills_wrapper),
+            description="Extract skills from CV text. Input: text (string, the CV text). Returns JSON with a 'handle' (opaque reference to the extracted skills, pass it to compare_skills) and count."
         ),
         Tool(
             name="extract_job_skills",
-            func=extract_job_skills_wrapper,
-            description="Extract skills from job description text. Input: text (string, the job description). Returns JSON with skills list and count."
+            func=_dedupe("extract_job_skills", extract_job_skills_wrapper),
+            description="Extract skills from job description text. Input: text (string, the job description). Returns JSON with a 'handle' (opaque reference to the extracted skills, pass it to compare_skills) and count."
+        ),
+        Tool(
+            name="extract_all_skills",
+            func=_dedupe("extract_all_skills", extract_all_skills_wrapper),
+            description="Extract skills from BOTH the CV and the job description in one call. Input: JSON string {\"cv_text\": \"...\", \"job_text\": \"...\"}. Returns JSON with cv_handle and job_handle (opaque references for compare_skills) and counts. PREFER this over calling extract_cv_skills then extract_job_skills: it runs both extractions concurrently and saves an agent step."
         ),
         Tool(
             name="compare_skills",
-            func=lambda cv_json, job_json: compare_skills_wrapper(cv_json, job_json),
-            description="Compare CV skills with job skills. Input: cv_skills_json (JSON string with skills), job_skills_json (JSON string with skills). Returns comparison results."
+            func=_dedupe("compare_skills", compare_skills_wrapper),
+            description="Compare CV skills with job skills. Input: cv_skills_json and job_skills_json, each a JSON string with either a 'handle' from an extract tool (preferred) or an inline 'skills' list. Returns comparison results."
         )
     ]
-    
+
+    if rag_system is not None:
+        tools.append(Tool(
+            name="search_context",
+            func=_dedupe("search_context", search_context_wrapper),
+            description="Semantic search over the CV and job description. Input: query (string). Returns JSON with cv_context, jd_context and their sources. ONLY use this when the request needs content lookup (e.g. 'what does my CV say about X'); skip it for direct edits like renaming or removing text."
+        ))
+
     return tools, get_current_cv
 
 
+# Static prompt text is hoisted to module constants: it is built once at
+# import instead of per request, and trimmed to compact bullets — every
+# redundant instruction line here was billed as prompt tokens on each call.
+_REACT_PROMPT_TEMPLATE = """You are a helpful assistant that MUST use tools to perform actions.
+
+You have access to the following tools:
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do, but KEEP IT SHORT
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+CRITICAL: act immediately — call tools, never describe what you will do.
+To remove/delete text: search_cv to find it, then update_cv_section to rewrite
+the section without it, then explain what you did.
+
+Begin!
+
+Question: {input}
+Thought: {agent_scratchpad}"""
+
+# Stable text first, changing text last: OpenAI prompt caching discounts a
+# byte-identical prefix, so the static rules/tool list lead and the per-turn
+# rag_context/user_request close the prompt
+_AGENT_INPUT_TEMPLATE = """You are a helpful assistant that helps users refine their optimized CV and correct skills detection.
+
+Rules:
+- Act by calling tools NOW — never announce or describe what you will do.
+- Tools use the current CV automatically; do not pass cv_text.
+- To remove/delete text: call search_cv(search_term="<exact text>"), then
+  update_cv_section(section_name="<section>", new_content="<section without the text>").
+- update_cv_section returns the updated CV; finish by explaining what you did.
+
+Available tools:
+- search_cv(search_term): search the CV, returns matches with line numbers.
+- update_cv_section(section_name, new_content): rewrite a section, returns the updated CV.
+- search_context(query): semantic search over the CV and job description — use ONLY
+  for content-lookup questions, never for direct edits.
+
+{rag_context}
+
+User Request: {user_request}"""
+
+# Memoized hub prompt: hub.pull is an HTTP round-trip to LangSmith Hub
+# (~100-500ms), so it must never run more than once per process
+_HUB_REACT_PROMPT = None
+
+
+def _get_hub_react_prompt():
+    """Pull (once) and reuse the hwchase17/react prompt from LangSmith Hub."""
+    global _HUB_REACT_PROMPT
+    if _HUB_REACT_PROMPT is None:
+        from langchain import hub
+        _HUB_REACT_PROMPT = hub.pull("hwchase17/react")
+    return _HUB_REACT_PROMPT
+
+
+def _get_react_prompt():
+    """Get the (parsed-once) custom ReAct prompt, or the hub prompt."""
+    global _REACT_PROMPT
+    if _REACT_PROMPT is None:
+        try:
+            from langchain_core.prompts import PromptTemplate
+            _REACT_PROMPT = PromptTemplate.from_template(_REACT_PROMPT_TEMPLATE)
+        except Exception:
+            _REACT_PROMPT = _get_hub_react_prompt()
+    return _REACT_PROMPT
+
+
+# Parsed lazily on first use: PromptTemplate.from_template re-tokenizes the
+# whole template string, which need not happen per request
+_REACT_PROMPT = None
+
+
+# The system message carries only conversation-stable content (rules +
+# target language); per-turn rag_context lives in the human message so the
+# system prefix stays byte-identical and prompt-cacheable across turns
+_FALLBACK_SYSTEM_TEMPLATE = """You are a helpful assistant that helps users refine their optimized CV and correct skills detection.
+
+WARNING: You are in fallback mode. Since AgentExecutor is not available, you cannot actually call tools.
+However, you should still provide helpful guidance and explain what changes would be made.
+
+For the user's request, explain what section would need to be modified and what the updated content would look like.
+
+Answer in {target_language}."""
+
+# Parsed once at import: rebuilding the ChatPromptTemplate per call reparses
+# the f-string templates and MessagesPlaceholder on every fallback invocation.
+# rag_context and target_language are template variables, so one prompt object
+# serves all languages.
+_FALLBACK_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _FALLBACK_SYSTEM_TEMPLATE),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("human", """Current optimized CV:
+{optimized_cv}
+
+Analyze the request. If you need to use tools, describe which tool and how. Then provide the updated CV text if changes are needed, or explain what you found.
+
+{rag_context}
+
+User Request: {user_request}""")
+])
+
+
+class AssistantResponse(BaseModel):
+    """Validated response schema for the non-agent assistant path."""
+    action: Optional[Literal["update_cv"]] = Field(
+        None, description="'update_cv' if the CV was modified, otherwise null"
+    )
+    updated_cv: Optional[str] = Field(
+        None, description="The complete updated CV text, only when it changed"
+    )
+    explanation: str = Field(
+        description="Explanation of what was done or found, in the user's language"
+    )
+
+
+# Fast-path patterns for trivial skill edits: these requests don't need an
+# LLM round-trip, a local text mutation answers in sub-millisecond time at
+# zero API cost. Anything that doesn't match cleanly falls through to the agent.
+_RENAME_RE = re.compile(
+    r"^(?:renomm\w*|rename)\s+(?:la\s+comp[ée]tence\s+|skill\s+)?"
+    r"['\"]?(.+?)['\"]?\s+(?:en|to|→|->)\s+['\"]?(.+?)['\"]?\s*\.?\s*$",
+    re.IGNORECASE
+)
+_REMOVE_RE = re.compile(
+    r"^(?:supprim\w*|retir\w*|enl[eè]v\w*|remove|delete)\s+"
+    r"(?:la\s+comp[ée]tence\s+|skill\s+)['\"]?(.+?)['\"]?\s*\.?\s*$",
+    re.IGNORECASE
+)
+
+# Trailing qualifiers ("rename Python to Java please", "... in my CV") get
+# swallowed into the lazy name captures above and would be written into the
+# CV verbatim. A capture containing any of these words is ambiguous, so the
+# request falls through to the agent instead of being edited locally.
+_EDIT_STOPWORDS_RE = re.compile(
+    r"\b(?:please|plz|thanks?|merci|stp|svp|por\s+favor|gracias|"
+    r"in|on|from|into|my|the|dans|sur|mon|ma|mes|cv|resume|r[ée]sum[ée])\b",
+    re.IGNORECASE
+)
+
+# Chit-chat detector: greetings/thanks need a single conversational LLM call,
+# not a ReAct agent run with tool schemas and up to _MAX_AGENT_ITERATIONS
+# round-trips. Only whole short messages match, so anything substantive
+# ("thanks, now also add Docker") still reaches the agent.
+_CHITCHAT_RE = re.compile(
+    r"^\s*(?:thanks?(?:\s+you)?|thank\s+you|merci(?:\s+beaucoup)?|gracias|"
+    r"hi|hello|hey|bonjour|salut|hola|ok(?:ay)?|great|perfect|super|parfait|"
+    r"g[ée]nial|top)\s*[!.,:)\s]*$",
+    re.IGNORECASE
+)
+
+_CHITCHAT_SYSTEM_TEMPLATE = (
+    "You are a friendly assistant helping a user refine their optimized CV. "
+    "The user sent a short conversational message (greeting, thanks, etc.). "
+    "Reply briefly and warmly, and remind them you can keep adjusting their "
+    "CV or skills if they wish. Answer in {target_language}."
+)
+
+_LANGUAGE_NAMES = {
+    "fr": "French (Français)",
+    "en": "English",
+    "es": "Spanish (Español)"
+}
+
+
+def _classify_intent(user_request: str) -> Optional[str]:
+    """Classify a request locally; returns 'chitchat' or None (uncertain)."""
+    if len(user_request) <= 60 and _CHITCHAT_RE.match(user_request):
+        return "chitchat"
+    return None
+
+
+def _answer_chitchat(
+    user_request: str,
+    optimized_cv: str,
+    api_key: str,
+    model: str,
+    temperature: float,
+    language: str,
+    memory: Optional[Any]
+) -> Dict[str, Any]:
+    """Answer a conversational message with one direct LLM call, no agent."""
+    llm = get_chat_model(model, temperature, api_key)
+    target_language = _LANGUAGE_NAMES.get(language, "French (Français)")
+    history = list(memory.chat_memory.messages)[-_HISTORY_WINDOW:] if memory is not None and hasattr(memory, 'chat_memory') else []
+    messages = [("system", _CHITCHAT_SYSTEM_TEMPLATE.format(target_language=target_language))]
+    messages.extend(history)
+    messages.append(("human", user_request))
+    explanation = llm.invoke(messages).content
+    if memory is not None and hasattr(memory, 'chat_memory'):
+        memory.chat_memory.add_user_message(user_request)
+        memory.chat_memory.add_ai_message(explanation)
+    return {
+        "action": None,
+        "updated_cv": optimized_cv,
+        "explanation": explanation,
+        "sources": [],
+        "agent_logs": [explanation]
+    }
+
+
+def try_local_skill_edit(user_request: str, optimized_cv: str, language: str = "fr") -> Optional[Dict[str, Any]]:
+    """
+    Handle pure skill rename/remove requests locally, without the agent.
+
+    Returns a result dict shaped like the agent's output when the request is
+    a recognized trivial edit that actually matched text in the CV, or None
+    to fall through to the full agent.
+    """
+    request_text = user_request.strip()
+
+    rename = _RENAME_RE.match(request_text)
+    if rename:
+        old_skill, new_skill = rename.group(1).strip(), rename.group(2).strip()
+        if _EDIT_STOPWORDS_RE.search(old_skill) or _EDIT_STOPWORDS_RE.search(new_skill):
+            return None
+        pattern = re.compile(r"\b" + re.escape(old_skill) + r"\b", re.IGNORECASE)
+        updated_cv, count = pattern.subn(new_skill, optimized_cv)
+        if count:
+            if language == "fr":
+                explanation = f"'{old_skill}' a été renommé en '{new_skill}' ({count} occurrence(s))."
+            else:
+                explanation = f"Renamed '{old_skill}' to '{new_skill}' ({count} occurrence(s))."
+            return {
+                "action": "update_cv",
+                "updated_cv": updated_cv,
+                "explanation": explanation,
+                "sources": [],
+                "agent_logs": [f"✓ Local edit: renamed '{old_skill}' to '{new_skill}'"]
+            }
+        return None
+
+    remove = _REMOVE_RE.match(request_text)
+    if remove:
+        skill = remove.group(1).strip()
+        if _EDIT_STOPWORDS_RE.search(skill):
+            return None
+        # Remove the skill from comma-separated lists, or drop the line if it
+        # stands alone; leave prose sentences to the agent
+        escaped = re.escape(skill)
+        list_pattern = re.compile(
+            r"(?:,\s*" + escaped + r"\b|\b" + escaped + r"\s*,\s*)",
+            re.IGNORECASE
+        )
+        standalone = re.compile(r"^\s*(?:[-•*]\s*)?" + escaped + r"\s*$", re.IGNORECASE)
+        lines = optimized_cv.split("\n")
+        new_lines = []
+        count = 0
+        for line in lines:
+            if standalone.match(line):
+                count += 1
+                continue
+            new_line, n = list_pattern.subn("", line)
+            count += n
+            new_lines.append(new_line)
+        if count:
+            if language == "fr":
+                explanation = f"La compétence '{skill}' a été supprimée ({count} occurrence(s))."
+            else:
+                explanation = f"Removed skill '{skill}' ({count} occurrence(s))."
+            return {
+                "action": "update_cv",
+                "updated_cv": "\n".join(new_lines),
+                "explanation": explanation,
+                "sources": [],
+                "agent_logs": [f"✓ Local edit: removed '{skill}'"]
+            }
+        return None
+
+    return None
+
+
+# Compiled once: one C-level alternation scan over the whole buffer replaces
+# the per-line any(keyword in line ...) Python loop over six keywords
+_CV_SECTION_KW_RE = re.compile(r"NAME|EXPERIENCE|EDUCATION|SKILLS|SUMMARY|CERTIFICATIONS")
+_CV_HEAD_KW_RE = re.compile(r"EXPERIENCE|EDUCATION|SKILLS|SUMMARY")
+_BLANK_LINE_RE = re.compile(r"(?m)^[ \t\r\f\v]*$")
+
+
+def _extract_cv_from_explanation(explanation: str, optimized_cv: str) -> Optional[str]:
+    """
+    Heuristically pull a full CV block out of a free-form LLM explanation.
+
+    Cheap bailout first: most responses just describe changes, so the scan
+    only runs when a section header appears in the (bounded) head. Keyword
+    hits are found in a single pass over the buffer and mapped to line
+    numbers; the block ends at the last header line, or at the first blank
+    line more than five lines past the start, matching the old per-line scan.
+
+    Returns the extracted block when it looks substantial enough to be the
+    CV (>30% of the current CV's length), else None.
+    """
+    if len(explanation) <= 500:
+        return None
+    upper = explanation.upper()
+    if not _CV_HEAD_KW_RE.search(upper, 0, 4000):
+        return None
+
+    # Newline offsets once, then bisect match offsets to line numbers
+    newline_pos = []
+    pos = explanation.find('\n')
+    while pos != -1:
+        newline_pos.append(pos)
+        pos = explanation.find('\n', pos + 1)
+
+    keyword_lines = sorted({
+        bisect.bisect_right(newline_pos, m.start())
+        for m in _CV_SECTION_KW_RE.finditer(upper)
+    })
+    if not keyword_lines:
+        return None
+
+    cv_start = keyword_lines[0]
+    cv_end = keyword_lines[-1] + 1
+    # bisect_left: an empty blank line starts exactly at the previous
+    # newline offset, which bisect_right would push to the next line
+    for m in _BLANK_LINE_RE.finditer(explanation):
+        line_idx = bisect.bisect_left(newline_pos, m.start())
+        if line_idx >= cv_start + 6:
+            cv_end = line_idx
+            break
+
+    # Slice the block straight out of the buffer by character offsets —
+    # no line list, no per-line copies, no join
+    start_char = newline_pos[cv_start - 1] + 1 if cv_start > 0 else 0
+    end_char = newline_pos[cv_end - 1] if cv_end <= len(newline_pos) else len(explanation)
+    extracted = explanation[start_char:end_char]
+    if len(extracted) > len(optimized_cv) * 0.3:
+        return extracted
+    return None
+
+
+def _finalize_agent_result(
+    result: Dict[str, Any],
+    optimized_cv: str,
+    get_current_cv: Callable[[], str],
+    memory: Any,
+    user_request: str,
+    sources: List[Any]
+) -> Dict[str, Any]:
+    """
+    Turn a completed agent run into the assistant response dict.
+
+    Extracts the updated CV (tool closure first, then intermediate tool
+    results, then the explanation text as a last resort), collects sources
+    from search_context calls, and records the turn in memory. Shared by the
+    blocking and streaming entry points.
+    """
+    explanation = result.get("output", "")
+
+    # Try to extract updated CV from tool results (prioritize tool results)
+    updated_cv = optimized_cv
+    tool_error = None
+    last_updated_cv = None
+
+    # Single reverse pass: the newest step wins, so each value is taken at
+    # most once and the scan stops as soon as nothing is left to find
+    for step in reversed(result.get("intermediate_steps", [])):
+        if len(step) < 2:
+            continue
+        tool_result = step[1]
+
+        # Only attempt JSON parsing on strings that can be JSON objects
+        if isinstance(tool_result, str) and tool_result.lstrip().startswith('{'):
+            try:
+                tool_result = _json_loads(tool_result)
+            except:
+                pass
+
+        if isinstance(tool_result, str):
+            # Non-JSON observation: might be the CV text itself
+            if (last_updated_cv is None
+                    and ("updated_cv" in tool_result.lower() or len(tool_result) > 100)
+                    and len(tool_result) > len(optimized_cv) * 0.5):
+                last_updated_cv = tool_result
+        elif isinstance(tool_result, dict):
+            # Check for error status (most recent error wins)
+            if tool_error is None and tool_result.get("status") == "error":
+                tool_error = tool_result.get("error", "Unknown tool error")
+
+            # Collect sources from search_context calls
+            if not sources and ("cv_sources" in tool_result or "jd_sources" in tool_result):
+                sources = tool_result.get("cv_sources", []) + tool_result.get("jd_sources", [])
+
+            # Try to get updated_cv from tool result (most recent wins)
+            if last_updated_cv is None and "updated_cv" in tool_result:
+                cv_data = tool_result["updated_cv"]
+                if isinstance(cv_data, str) and cv_data.lstrip().startswith('{'):
+                    try:
+                        parsed = _json_loads(cv_data)
+                        if isinstance(parsed, dict) and "updated_cv" in parsed:
+                            cv_data = parsed["updated_cv"]
+                    except:
+                        pass
+                last_updated_cv = cv_data
+
+        if last_updated_cv is not None and sources:
+            break
+
+    # Use the most recent updated_cv if found
+    if last_updated_cv and len(last_updated_cv) > len(optimized_cv) * 0.3:
+        updated_cv = last_updated_cv
+
+    # Get the current CV from the closure (most reliable)
+    try:
+        current_cv_from_tools = get_current_cv()
+        if current_cv_from_tools and current_cv_from_tools != optimized_cv:
+            updated_cv = current_cv_from_tools
+            logger.info("CV updated via closure: %d chars (was %d chars)", len(updated_cv), len(optimized_cv))
+    except Exception as e:
+        logger.warning("Error getting current CV from tools: %s", e)
+
+    # Debug: Check if CV actually changed
+    if updated_cv == optimized_cv:
+        logger.warning("updated_cv is identical to optimized_cv. Length: %d", len(updated_cv))
+        logger.warning("Last updated_cv from tools: %.100s...", last_updated_cv or "None")
+
+    # If no tool result, try to extract from explanation (fallback)
+    if updated_cv == optimized_cv:
+        extracted_cv = _extract_cv_from_explanation(explanation, optimized_cv)
+        if extracted_cv is not None:
+            updated_cv = extracted_cv
+
+    # If tool returned an error, include it in the explanation
+    if tool_error:
+        explanation = f"{explanation}\n\nTool error: {tool_error}"
+
+    # Add to memory
+    if hasattr(memory, 'chat_memory'):
+        memory.chat_memory.add_user_message(user_request)
+        memory.chat_memory.add_ai_message(explanation)
+
+    # Only return update_cv action if CV actually changed
+    action = "update_cv" if updated_cv != optimized_cv else None
+
+    return {
+        "action": action,
+        "updated_cv": updated_cv,
+        "explanation": explanation,
+        "sources": sources,
+        "agent_logs": [explanation]
+    }
+
+
 def process_assistant_request_with_agent(
     user_request: str,
     original_cv: str,
@@ -172,6 +798,21 @@ def process_assistant_request_with_agent(
     Uses LangChain's AgentExecutor for true ReAct agent behavior.
     """
     try:
+        # Short-circuit trivial skill edits before paying for an agent run
+        local_result = try_local_skill_edit(user_request, optimized_cv, language)
+        if local_result is not None:
+            if memory is not None and hasattr(memory, 'chat_memory'):
+                memory.chat_memory.add_user_message(user_request)
+                memory.chat_memory.add_ai_message(local_result["explanation"])
+            return local_result
+
+        # Chit-chat skips the ReAct scaffold entirely: one direct chat
+        # completion instead of an agent run with tool schemas
+        if _classify_intent(user_request) == "chitchat":
+            return _answer_chitchat(
+                user_request, optimized_cv, api_key, model, temperature, language, memory
+            )
+
         langfuse_callback = create_langfuse_callback(
             trace_name="assistant_conversation",
             session_id=session_id or "default",
@@ -184,54 +825,21 @@ def process_assistant_request_with_agent(
             }
         )
         
-        callbacks = [langfuse_callback] if langfuse_callback else None
-        
-        llm = ChatOpenAI(
-            model=model,
-            temperature=temperature,
-            api_key=api_key,
-            callbacks=callbacks
-        )
+        # Shared client: callbacks are passed per-invocation via config so the
+        # cached instance stays callback-free
+        llm = get_chat_model(model, temperature, api_key)
         
         if memory is None:
-            memory = ConversationBufferMemory(
-                memory_key="chat_history",
-                return_messages=True
-            )
-        
-        # Create tools for the agent (bound with current CV)
-        tools, get_current_cv = create_assistant_tools(api_key, optimized_cv)
+            memory = _default_memory()
         
-        # RAG retrieval if available
+        # Create tools for the agent (bound with current CV). RAG is exposed
+        # as the search_context tool instead of an eager per-request retrieval,
+        # so greetings and direct edits skip the embed + vector search entirely
+        tools, get_current_cv = create_assistant_tools(api_key, optimized_cv, rag_system)
+
         rag_context = ""
         sources = []
-        if rag_system:
-            try:
-                # Retrieve relevant chunks using user request as query
-                rag_result = rag_system.get_context_with_sources(
-                    query=user_request,
-                    k_cv=3,
-                    k_jd=2
-                )
-                
-                cv_context = rag_result.get("cv_context", "")
-                jd_context = rag_result.get("jd_context", "")
-                cv_sources = rag_result.get("cv_sources", [])
-                jd_sources = rag_result.get("jd_sources", [])
-                
-                if cv_context or jd_context:
-                    rag_context = f"""
-Relevant context from semantic search:
-CV chunks: {cv_context}
-Job description chunks: {jd_context}
 
-Use this context to better understand the user's request and provide accurate responses.
-"""
-                    sources = cv_sources + jd_sources
-            except Exception as e:
-                print(f"RAG retrieval failed: {str(e)}")
-                rag_context = ""
-        
         # Add context variables that tools can access
         context_vars = {
             "optimized_cv": optimized_cv,
@@ -242,12 +850,7 @@ Use this context to better understand the user's request and provide accurate re
         }
         
         # Create a custom prompt that includes context
-        language_names = {
-            "fr": "French (Français)",
-            "en": "English",
-            "es": "Spanish (Español)"
-        }
-        target_language = language_names.get(language, "French (Français)")
+        target_language = _LANGUAGE_NAMES.get(language, "French (Français)")
         
         # Try to use AgentExecutor if available, fallback to manual if not
         use_agent_executor = HAS_AGENT_EXECUTOR
@@ -255,41 +858,10 @@ Use this context to better understand the user's request and provide accurate re
         
         if use_agent_executor:
             try:
-                # Try to use custom prompt first, fallback to hub
-                try:
-                    from langchain_core.prompts import PromptTemplate
-                    # Custom strict ReAct prompt that forces tool usage
-                    custom_prompt = PromptTemplate.from_template("""You are a helpful assistant that MUST use tools to perform actions.
-
-You have access to the following tools:
-{tools}
-
-Use the following format:
-
-Question: the input question you must answer
-Thought: you should always think about what to do, but KEEP IT SHORT
-Action: the action to take, should be one of [{tool_names}]
-Action Input: the input to the action
-Observation: the result of the action
-... (this Thought/Action/Action Input/Observation can repeat N times)
-Thought: I now know the final answer
-Final Answer: the final answer to the original input question
+                AgentExecutor, create_react_agent = _agent_imports()
 
-CRITICAL: When the user asks to remove/delete text:
-1. IMMEDIATELY use search_cv to find it (do not describe, just do it)
-2. IMMEDIATELY use update_cv_section to remove it (do not describe, just do it)
-3. Then explain what you did
-
-DO NOT describe what you will do - DO IT. Start with Action: immediately.
-
-Begin!
-
-Question: {input}
-Thought: {agent_scratchpad}""")
-                    prompt_template = custom_prompt
-                except:
-                    # Fallback to hub prompt
-                    prompt_template = hub.pull("hwchase17/react")
+                # Custom strict ReAct prompt (parsed once), hub as fallback
+                prompt_template = _get_react_prompt()
                 
                 # Create agent with ReAct prompt
                 agent = create_react_agent(llm, tools, prompt_template)
@@ -299,61 +871,29 @@ Thought: {agent_scratchpad}""")
                     agent=agent,
                     tools=tools,
                     memory=memory,
-                    verbose=True,
+                    verbose=_VERBOSE,
                     handle_parsing_errors=True,
-                    max_iterations=10,  # Increased to allow more tool calls
+                    max_iterations=_MAX_AGENT_ITERATIONS,
+                    # "force" is the only stopping method runnable ReAct agents
+                    # support; capped runs still recover work via the
+                    # intermediate steps returned below
+                    early_stopping_method="force",
                     return_intermediate_steps=True  # Important: return tool calls
                 )
             except Exception as hub_error:
                 # If hub.pull fails, fall through to manual implementation
                 use_agent_executor = False
                 agent_executor = None
-                print(f"Hub not available, using fallback: {hub_error}")
+                logger.warning("Hub not available, using fallback: %s", hub_error)
         
         if use_agent_executor and agent_executor:
             try:
                 # Prepare input with context (STRICT: Must use tools, not describe)
-                input_text = f"""You are a helpful assistant that helps users refine their optimized CV and correct skills detection.
-
-{rag_context}
-
-User Request: {user_request}
-
-CRITICAL INSTRUCTIONS - READ CAREFULLY:
-- You MUST use the available tools to perform actions. DO NOT describe what you will do - DO IT NOW.
-- DO NOT say "I will search" or "I will update" - ACTUALLY CALL THE TOOLS.
-- The tools automatically use the current CV - you do NOT need to pass cv_text parameter.
-- When the user asks to remove/delete text, you MUST:
-  1. IMMEDIATELY call search_cv(search_term="<exact text to find>") - do not describe, just call it
-  2. From the search results, identify which section contains the text
-  3. IMMEDIATELY call update_cv_section(section_name="<section>", new_content="<complete section without the text>")
-  4. The tool will return the updated CV automatically
-
-FORBIDDEN: Do NOT say:
-- "I will search" → CALL search_cv NOW
-- "I will update" → CALL update_cv_section NOW  
-- "Let me do that" → DO IT NOW
-- "I'm going to" → DO IT NOW
-
-REQUIRED: You MUST start your response by calling the appropriate tool(s). For deletions:
-- Step 1: Call search_cv(search_term="<text>") immediately
-- Step 2: Call update_cv_section(section_name="<section>", new_content="<section without text>") immediately
-- Step 3: Then explain what you did
+                input_text = _AGENT_INPUT_TEMPLATE.format(
+                    rag_context=rag_context,
+                    user_request=user_request
+                )
 
-Available tools:
-- search_cv(search_term): Search in CV. Returns matches with line numbers.
-- update_cv_section(section_name, new_content): Updates a section. Returns updated CV.
-
-Example for deletion request:
-User: "remove '28/07/2003 | Paris'"
-You MUST respond with:
-Action: search_cv(search_term="28/07/2003 | Paris")
-[Wait for result]
-Action: update_cv_section(section_name="Header", new_content="<section without that line>")
-[Then explain]
-
-DO NOT describe - ACT. Start by calling tools immediately."""
-            
                 # AgentExecutor handles memory automatically via the memory parameter
                 config = {}
                 if langfuse_callback:
@@ -363,169 +903,94 @@ DO NOT describe - ACT. Start by calling tools immediately."""
                     {"input": input_text},
                     config=config if config else {}
                 )
-                
-                explanation = result.get("output", "")
-                
-                # Try to extract updated CV from tool results (prioritize tool results)
-                updated_cv = optimized_cv
-                tool_error = None
-                last_updated_cv = None
-                
-                if "intermediate_steps" in result:
-                    # Process steps in reverse to get the most recent update
-                    for step in reversed(result["intermediate_steps"]):
-                        if len(step) > 1:
-                            tool_result = step[1]
-                            # Handle both dict and string results
-                            if isinstance(tool_result, str):
-                                try:
-                                    tool_result = json.loads(tool_result)
-                                except:
-                                    # If not JSON, check if it contains updated_cv pattern
-                                    if "updated_cv" in tool_result.lower() or len(tool_result) > 100:
-                                        # Might be the CV text itself
-                                        if len(tool_result) > len(optimized_cv) * 0.5:
-                                            last_updated_cv = tool_result
-                                    pass
-                            
-                            if isinstance(tool_result, dict):
-                                # Check for error status
-                                if tool_result.get("status") == "error":
-                                    tool_error = tool_result.get("error", "Unknown tool error")
-                                
-                                # Try to get updated_cv from tool result
-                                if "updated_cv" in tool_result:
-                                    try:
-                                        cv_data = tool_result["updated_cv"]
-                                        # If it's a string, try to parse it
-                                        if isinstance(cv_data, str):
-                                            try:
-                                                parsed = json.loads(cv_data)
-                                                if isinstance(parsed, dict) and "updated_cv" in parsed:
-                                                    last_updated_cv = parsed["updated_cv"]
-                                                else:
-                                                    last_updated_cv = cv_data
-                                            except:
-                                                last_updated_cv = cv_data
-                                        else:
-                                            last_updated_cv = cv_data
-                                    except Exception as e:
-                                        print(f"Error extracting updated_cv: {e}")
-                
-                # Use the most recent updated_cv if found
-                if last_updated_cv and len(last_updated_cv) > len(optimized_cv) * 0.3:
-                    updated_cv = last_updated_cv
-                
-                # Get the current CV from the closure (most reliable)
-                try:
-                    current_cv_from_tools = get_current_cv()
-                    if current_cv_from_tools and current_cv_from_tools != optimized_cv:
-                        updated_cv = current_cv_from_tools
-                        print(f"CV updated via closure: {len(updated_cv)} chars (was {len(optimized_cv)} chars)")
-                except Exception as e:
-                    print(f"Error getting current CV from tools: {e}")
-                
-                # Debug: Check if CV actually changed
-                if updated_cv == optimized_cv:
-                    print(f"WARNING: updated_cv is identical to optimized_cv. Length: {len(updated_cv)}")
-                    print(f"Last updated_cv from tools: {last_updated_cv[:100] if last_updated_cv else 'None'}...")
-                
-                # If no tool result, try to extract from explanation (fallback)
-                if updated_cv == optimized_cv and len(explanation) > 500:
-                    # Look for CV-like content in explanation
-                    lines = explanation.split('\n')
-                    cv_start = None
-                    cv_end = None
-                    for i, line in enumerate(lines):
-                        line_upper = line.upper().strip()
-                        # Look for CV section headers
-                        if any(keyword in line_upper for keyword in ["NAME", "EXPERIENCE", "EDUCATION", "SKILLS", "SUMMARY", "CERTIFICATIONS"]):
-                            if cv_start is None:
-                                cv_start = i
-                            cv_end = i + 1
-                        # If we found a start and hit a blank line or new section, we might have the CV
-                        elif cv_start is not None and len(line.strip()) == 0:
-                            if i - cv_start > 5:  # At least 5 lines of content
-                                cv_end = i
-                                break
-                    
-                    if cv_start is not None:
-                        if cv_end is None:
-                            cv_end = len(lines)
-                        extracted_cv = '\n'.join(lines[cv_start:cv_end])
-                        if len(extracted_cv) > len(optimized_cv) * 0.3:
-                            updated_cv = extracted_cv
-                
-                # If tool returned an error, include it in the explanation
-                if tool_error:
-                    explanation = f"{explanation}\n\nTool error: {tool_error}"
-                
-                # Add to memory
-                if hasattr(memory, 'chat_memory'):
-                    memory.chat_memory.add_user_message(user_request)
-                    memory.chat_memory.add_ai_message(explanation)
-                
-                # Only return update_cv action if CV actually changed
-                action = "update_cv" if updated_cv != optimized_cv else None
-                
-                return {
-                    "action": action,
-                    "updated_cv": updated_cv,
-                    "explanation": explanation,
-                    "sources": sources,
-                    "agent_logs": [explanation]
-                }
+
+                return _finalize_agent_result(
+                    result, optimized_cv, get_current_cv, memory, user_request, sources
+                )
             except Exception as agent_error:
                 # Fallback to simpler implementation if AgentExecutor fails
-                print(f"AgentExecutor execution failed, using fallback: {agent_error}")
+                logger.warning("AgentExecutor execution failed, using fallback: %s", agent_error)
                 use_agent_executor = False
         
         # Fallback to simpler implementation if AgentExecutor not available
         if not use_agent_executor:
-            
-            # Use simple LLM with tools in prompt (fallback implementation)
-            system_message = f"""You are a helpful assistant that helps users refine their optimized CV and correct skills detection.
 
-{rag_context}
-
-WARNING: You are in fallback mode. Since AgentExecutor is not available, you cannot actually call tools.
-However, you should still provide helpful guidance and explain what changes would be made.
+            # The fallback can't call tools, so retrieve RAG context eagerly here
+            if rag_system:
+                try:
+                    rag_result = rag_system.get_context_with_sources(
+                        query=user_request,
+                        k_cv=3,
+                        k_jd=2
+                    )
+                    cv_context = rag_result.get("cv_context", "")
+                    jd_context = rag_result.get("jd_context", "")
+                    if cv_context or jd_context:
+                        rag_context = f"""
+Relevant context from semantic search:
+CV chunks: {cv_context}
+Job description chunks: {jd_context}
 
-For the user's request, explain what section would need to be modified and what the updated content would look like.
+Use this context to better understand the user's request and provide accurate responses.
+"""
+                        sources = rag_result.get("cv_sources", []) + rag_result.get("jd_sources", [])
+                except Exception as e:
+                    logger.warning("RAG retrieval failed: %s", e)
+                    rag_context = ""
 
-Answer in {target_language}."""
-            
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_message),
-                MessagesPlaceholder(variable_name="chat_history"),
-                ("human", """{rag_context}
-Current optimized CV:
-{optimized_cv}
+            # Use simple LLM with the prompt template prebuilt at module scope
+            prompt = _FALLBACK_PROMPT
 
-User Request: {user_request}
+            # Slice to the window here too, in case a full-buffer memory was passed in
+            chat_history = list(memory.chat_memory.messages)[-_HISTORY_WINDOW:] if hasattr(memory, 'chat_memory') else []
 
-Analyze the request. If you need to use tools, describe which tool and how. Then provide the updated CV text if changes are needed, or explain what you found.""")
-            ])
-            
-            chain = prompt | llm
-            
-            chat_history = memory.chat_memory.messages if hasattr(memory, 'chat_memory') else []
-            
             # Pass callbacks to chain invoke
             invoke_config = {}
             if langfuse_callback:
                 invoke_config["callbacks"] = [langfuse_callback]
-            
+
+            invoke_input = {
+                "rag_context": rag_context,
+                "target_language": target_language,
+                "optimized_cv": optimized_cv,
+                "user_request": user_request,
+                "chat_history": chat_history
+            }
+
+            # Prefer structured output: the response comes back as a validated
+            # AssistantResponse, so no CV-extraction heuristics are needed
+            try:
+                structured_chain = prompt | llm.with_structured_output(AssistantResponse)
+                structured = structured_chain.invoke(
+                    invoke_input,
+                    config=invoke_config if invoke_config else {}
+                )
+                explanation = structured.explanation
+                updated_cv = structured.updated_cv or optimized_cv
+
+                if hasattr(memory, 'chat_memory'):
+                    memory.chat_memory.add_user_message(user_request)
+                    memory.chat_memory.add_ai_message(explanation)
+
+                return {
+                    "action": "update_cv" if updated_cv != optimized_cv else None,
+                    "updated_cv": updated_cv,
+                    "explanation": explanation,
+                    "sources": sources,
+                    "agent_logs": [explanation]
+                }
+            except Exception as structured_error:
+                # Model/wrapper without structured-output support: fall back to
+                # free-form text and the extraction heuristics below
+                logger.warning("Structured output unavailable, using free-form fallback: %s", structured_error)
+
+            chain = prompt | llm
+
             response = chain.invoke(
-                {
-                    "rag_context": rag_context,
-                    "optimized_cv": optimized_cv,
-                    "user_request": user_request,
-                    "chat_history": chat_history
-                },
+                invoke_input,
                 config=invoke_config if invoke_config else {}
             )
-            
+
             explanation = response.content
             
             # Get the current CV from the closure (most reliable)
@@ -534,41 +999,20 @@ Analyze the request. If you need to use tools, describe which tool and how. Then
                 current_cv_from_tools = get_current_cv()
                 if current_cv_from_tools and current_cv_from_tools != optimized_cv:
                     updated_cv = current_cv_from_tools
-                    print(f"CV updated via closure (fallback): {len(updated_cv)} chars (was {len(optimized_cv)} chars)")
+                    logger.info("CV updated via closure (fallback): %d chars (was %d chars)", len(updated_cv), len(optimized_cv))
             except Exception as e:
-                print(f"Error getting current CV from tools: {e}")
+                logger.warning("Error getting current CV from tools: %s", e)
             
             # Debug: Check if CV actually changed
             if updated_cv == optimized_cv:
-                print(f"WARNING (fallback): updated_cv is identical to optimized_cv. Length: {len(updated_cv)}")
+                logger.warning("(fallback) updated_cv is identical to optimized_cv. Length: %d", len(updated_cv))
             
-            # Try to extract updated CV from response (improved extraction) - fallback
-            if updated_cv == optimized_cv and len(explanation) > 500:
-                lines = explanation.split('\n')
-                cv_start = None
-                cv_end = None
-                
-                # Look for CV-like content in explanation
-                for i, line in enumerate(lines):
-                    line_upper = line.upper().strip()
-                    # Look for CV section headers
-                    if any(keyword in line_upper for keyword in ["NAME", "EXPERIENCE", "EDUCATION", "SKILLS", "SUMMARY", "CERTIFICATIONS"]):
-                        if cv_start is None:
-                            cv_start = i
-                        cv_end = i + 1
-                    # If we found a start and hit a blank line or new section, we might have the CV
-                    elif cv_start is not None and len(line.strip()) == 0:
-                        if i - cv_start > 5:  # At least 5 lines of content
-                            cv_end = i
-                            break
-                
-                if cv_start is not None:
-                    if cv_end is None:
-                        cv_end = len(lines)
-                    extracted_cv = '\n'.join(lines[cv_start:cv_end])
-                    # Only use if it's substantial enough (at least 30% of original length)
-                    if len(extracted_cv) > len(optimized_cv) * 0.3:
-                        updated_cv = extracted_cv
+            # Try to extract updated CV from response (same heuristic as the
+            # agent path)
+            if updated_cv == optimized_cv:
+                extracted_cv = _extract_cv_from_explanation(explanation, optimized_cv)
+                if extracted_cv is not None:
+                    updated_cv = extracted_cv
             
             # Add to memory
             if hasattr(memory, 'chat_memory'):
@@ -592,4 +1036,131 @@ Analyze the request. If you need to use tools, describe which tool and how. Then
             "action": None,
             "updated_cv": optimized_cv,
             "explanation": None
-        }
\ No newline at end of file
+        }
+
+
+def stream_assistant_request(
+    user_request: str,
+    original_cv: str,
+    optimized_cv: str,
+    job_description: str,
+    cv_skills: List[str],
+    job_skills: List[str],
+    matched_skills: Dict[str, Any],
+    api_key: str,
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.7,
+    language: str = "fr",
+    memory: Optional[ConversationBufferMemory] = None,
+    rag_system: Optional[Any] = None,
+    session_id: Optional[str] = None
+):
+    """
+    Streaming variant of process_assistant_request_with_agent.
+
+    Yields one event dict per agent step as it happens ({"event": "tool_start"}
+    / {"event": "tool_end"}), so the client sees progress at first-tool time
+    instead of waiting for the full ReAct trace, then a final
+    {"event": "result", "data": ...} with the same payload as the blocking
+    entry point.
+    """
+    try:
+        # Trivial edits resolve immediately — single result event
+        local_result = try_local_skill_edit(user_request, optimized_cv, language)
+        if local_result is not None:
+            if memory is not None and hasattr(memory, 'chat_memory'):
+                memory.chat_memory.add_user_message(user_request)
+                memory.chat_memory.add_ai_message(local_result["explanation"])
+            yield {"event": "result", "data": local_result}
+            return
+
+        # Chit-chat: one direct LLM call, single result event
+        if _classify_intent(user_request) == "chitchat":
+            result = _answer_chitchat(
+                user_request, optimized_cv, api_key, model, temperature, language, memory
+            )
+            yield {"event": "result", "data": result}
+            return
+
+        if not HAS_AGENT_EXECUTOR:
+            # No step-by-step execution to stream; run blocking and emit once
+            result = process_assistant_request_with_agent(
+                user_request=user_request,
+                original_cv=original_cv,
+                optimized_cv=optimized_cv,
+                job_description=job_description,
+                cv_skills=cv_skills,
+                job_skills=job_skills,
+                matched_skills=matched_skills,
+                api_key=api_key,
+                model=model,
+                temperature=temperature,
+                language=language,
+                memory=memory,
+                rag_system=rag_system,
+                session_id=session_id
+            )
+            yield {"event": "result", "data": result}
+            return
+
+        langfuse_callback = create_langfuse_callback(
+            trace_name="assistant_conversation_stream",
+            session_id=session_id or "default",
+            metadata={
+                "model": model,
+                "temperature": temperature,
+                "language": language,
+                "has_rag": rag_system is not None,
+                "request_type": "cv_modification"
+            }
+        )
+
+        llm = get_chat_model(model, temperature, api_key)
+
+        if memory is None:
+            memory = _default_memory()
+
+        tools, get_current_cv = create_assistant_tools(api_key, optimized_cv, rag_system)
+
+        AgentExecutor, create_react_agent = _agent_imports()
+        prompt_template = _get_react_prompt()
+
+        agent = create_react_agent(llm, tools, prompt_template)
+        agent_executor = AgentExecutor(
+            agent=agent,
+            tools=tools,
+            memory=memory,
+            verbose=_VERBOSE,
+            handle_parsing_errors=True,
+            max_iterations=_MAX_AGENT_ITERATIONS,
+            early_stopping_method="force",
+            return_intermediate_steps=True
+        )
+
+        input_text = _AGENT_INPUT_TEMPLATE.format(
+            rag_context="",
+            user_request=user_request
+        )
+
+        config = {}
+        if langfuse_callback:
+            config["callbacks"] = [langfuse_callback]
+
+        # AgentExecutor.stream yields per-step chunks: "actions" when a tool
+        # is about to run, "steps" when it returned, "output" at the end
+        collected = {"output": "", "intermediate_steps": []}
+        for chunk in agent_executor.stream({"input": input_text}, config=config):
+            for agent_action in chunk.get("actions", []):
+                yield {"event": "tool_start", "tool": agent_action.tool}
+            for step in chunk.get("steps", []):
+                collected["intermediate_steps"].append((step.action, step.observation))
+                yield {"event": "tool_end", "tool": step.action.tool}
+            if "output" in chunk:
+                collected["output"] = chunk["output"]
+
+        final_result = _finalize_agent_result(
+            collected, optimized_cv, get_current_cv, memory, user_request, []
+        )
+        yield {"event": "result", "data": final_result}
+    except Exception as e:
+        yield {"event": "error", "error": str(e)}
@@ -2,22 +2,52 @@
 CV Optimization Agent using LangGraph
 Uses a multi-step workflow with tools to optimize CVs
 """
-from typing import Dict, Any, List, Optional, TypedDict
-from langchain_openai import ChatOpenAI
+import operator
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Annotated, Dict, Any, List, Optional, TypedDict
 from langchain_core.prompts import ChatPromptTemplate
+from utils.llm_client import get_chat_model, invoke_with_backoff
 from langgraph.graph import StateGraph, END
 from utils.tools import (
     analyze_cv_structure_tool,
-    extract_skills_tool,
+    cached_extract_skills,
     compare_skills_tool,
     compare_skills_tool_with_rag
 )
 from utils.rag_system import RAGSystem
 from utils.langfuse_config import create_langfuse_callback, create_langgraph_tracer
 
+try:
+    from rank_bm25 import BM25Okapi
+except ImportError:
+    BM25Okapi = None
+
+
+def _merge_rag_details(
+    existing: Optional[Dict[str, Any]],
+    new: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Reducer for rag_details: merge per-node sub-dicts instead of replacing."""
+    if not new:
+        return existing
+    if not existing:
+        return dict(new)
+    merged = dict(existing)
+    merged.update(new)
+    return merged
+
 
 class CVOptimizationState(TypedDict):
-    """State for the CV optimization agent"""
+    """State for the CV optimization agent.
+
+    agent_logs and rag_details carry reducers so nodes can return only their
+    delta (new log lines, their own rag_details sub-dict) and LangGraph merges
+    it into the state, instead of every node re-returning the full state dict
+    with the large cv/jd texts in it.
+    """
     cv_text: str
     job_description: str
     api_key: str
@@ -40,98 +70,214 @@ class CVOptimizationState(TypedDict):
     # Final result
     optimized_cv: Optional[str]
     sources: Optional[Dict[str, List[str]]]
-    rag_details: Optional[Dict[str, Any]]
+    rag_details: Annotated[Optional[Dict[str, Any]], _merge_rag_details]
     error: Optional[str]
-    agent_logs: List[str]
+    agent_logs: Annotated[List[str], operator.add]
+
+
+_LANGUAGE_NAMES = {
+    "fr": "French (Français)",
+    "en": "English",
+    "es": "Spanish (Español)"
+}
+
+_WORD_RE = re.compile(r"\S+")
+
+
+def _word_count(text: str) -> int:
+    """Count words without str.split()'s throwaway list of substrings."""
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+
+# Line budget for the CV body in the generation prompt; CVs within the budget
+# pass through untouched. Set to 0 to always send the full CV.
+_CV_EXCERPT_MAX_LINES = int(os.getenv("CV_EXCERPT_MAX_LINES", "60"))
+_CV_EXCERPT_HEADER_LINES = 5
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _select_relevant_cv_lines(
+    cv_text: str,
+    job_skills: List[str],
+    max_lines: Optional[int] = None
+) -> tuple:
+    """Window a long CV to the lines most relevant to the extracted job skills.
+
+    The generation prompt otherwise carries the full CV on top of the RAG
+    context and the skills summary, so for long CVs those prompt tokens
+    dominate cost and time-to-first-token. Lines are scored against the job
+    skills (BM25 when rank_bm25 is installed, skill-term hits otherwise) and
+    the top max_lines are kept in document order; the leading header lines
+    are always preserved so contact details survive the cut.
+
+    Returns:
+        Tuple of (text, kept_line_count, total_line_count)
+    """
+    if max_lines is None:
+        max_lines = _CV_EXCERPT_MAX_LINES
+    lines = [line for line in cv_text.splitlines() if line.strip()]
+    total = len(lines)
+    if max_lines <= 0 or total <= max_lines or not job_skills:
+        return cv_text, total, total
+
+    skill_terms = [skill.lower() for skill in job_skills]
+    if BM25Okapi is not None:
+        corpus = [_TOKEN_RE.findall(line.lower()) for line in lines]
+        query = [token for term in skill_terms for token in _TOKEN_RE.findall(term)]
+        scores = list(BM25Okapi(corpus).get_scores(query))
+    else:
+        scores = [
+            sum(1 for term in skill_terms if term in line_lower)
+            for line_lower in (line.lower() for line in lines)
+        ]
+
+    keep = set(range(min(_CV_EXCERPT_HEADER_LINES, total)))
+    for idx in sorted(range(total), key=lambda i: scores[i], reverse=True):
+        if len(keep) >= max_lines:
+            break
+        keep.add(idx)
+    return "\n".join(lines[i] for i in sorted(keep)), len(keep), total
+
+_GENERATE_HUMAN_TEMPLATE = """{rag_context}
+Job Description:
+{job_description}
+
+Original CV:
+{cv_text}
+
+{cv_structure_info}
+{skills_info}
+
+Create an optimized CV tailored to this job description. Maintain all factual information but reorganize and rephrase to maximize relevance and impact. If RAG context is provided, use it as the primary source of information."""
+
+
+@lru_cache(maxsize=64)
+def _get_generation_prompt(
+    target_language: str,
+    min_experiences: int,
+    max_experiences: int,
+    max_date_years: Optional[int]
+) -> ChatPromptTemplate:
+    """
+    Build (once per parameter combination) the CV-generation prompt.
+
+    The system message only depends on these four request parameters, so the
+    compiled ChatPromptTemplate is cached instead of re-parsed per call;
+    per-request content (CV, JD, RAG context, skills) stays in template
+    variables.
+    """
+    date_filter = ""
+    if max_date_years:
+        date_filter = f"\n- Only include experiences from the last {max_date_years} years"
+
+    exp_filter = f"\n- Include between {min_experiences} and {max_experiences} professional experiences"
+
+    system_message = f"""You are an expert CV/resume optimizer. Your task is to tailor a candidate's CV to match a specific job description while maintaining authenticity and truthfulness.
+
+CRITICAL: The entire CV must be written in {target_language}. All sections, descriptions, and content must be in this language.
+
+Guidelines:
+- Keep all information factual and accurate
+- Reorganize and rephrase content to highlight relevant skills and experiences
+- Use action verbs and quantify achievements where possible
+- Maintain professional formatting with clear sections
+- Ensure ATS (Applicant Tracking System) compatibility
+- Keep the same structure: Header, Summary, Experience, Education, Skills, etc.{date_filter}{exp_filter}
+- Focus on experiences and skills most relevant to the job
+- Remove or de-emphasize irrelevant information
+- Use industry-standard terminology from the job description where appropriate
+- Write everything in {target_language} - section headers, descriptions, and all text
+- When RAG context is provided, prioritize information from those chunks as they are the most relevant
 
+Use the skills analysis to emphasize matching skills and address missing skills naturally in the content."""
 
-def analyze_structure(state: CVOptimizationState) -> CVOptimizationState:
+    return ChatPromptTemplate.from_messages([
+        ("system", system_message),
+        ("human", _GENERATE_HUMAN_TEMPLATE)
+    ])
+
+
+def analyze_structure(state: CVOptimizationState) -> Dict[str, Any]:
     """Node 1: Analyze CV structure"""
     try:
         result = analyze_cv_structure_tool.invoke({"cv_text": state["cv_text"]})
-        state["cv_structure"] = result
-        state["agent_logs"].append(f"✓ Analyzed CV structure: Found {result.get('section_count', 0)} sections")
-        return state
+        return {
+            "cv_structure": result,
+            "agent_logs": [f"✓ Analyzed CV structure: Found {result.get('section_count', 0)} sections"]
+        }
     except Exception as e:
-        state["agent_logs"].append(f"✗ Error analyzing CV structure: {str(e)}")
-        state["error"] = str(e)
-        return state
-
+        return {
+            "error": str(e),
+            "agent_logs": [f"✗ Error analyzing CV structure: {str(e)}"]
+        }
 
-def extract_cv_skills(state: CVOptimizationState) -> CVOptimizationState:
-    """Node 2: Extract skills from CV"""
-    try:
-        result = extract_skills_tool.invoke({
-            "text": state["cv_text"],
-            "text_type": "cv",
-            "api_key": state["api_key"],
-            "model": state["model"]
-        })
-        state["cv_skills"] = result.get("skills", [])
-        state["agent_logs"].append(f"✓ Extracted {len(state['cv_skills'])} skills from CV")
-        return state
-    except Exception as e:
-        state["agent_logs"].append(f"✗ Error extracting CV skills: {str(e)}")
-        state["error"] = str(e)
-        return state
 
+def extract_and_index(state: CVOptimizationState) -> Dict[str, Any]:
+    """Node 2: Extract CV/JD skills and index both texts in the vector store.
 
-def extract_job_skills(state: CVOptimizationState) -> CVOptimizationState:
-    """Node 3: Extract skills from job description"""
+    The two LLM extractions and the two embedding+index runs have no data
+    dependency on each other, so all four network round-trips overlap in one
+    thread fan-out: wall time is max(latencies) instead of their sum.
+    """
+    logs: List[str] = []
     try:
-        result = extract_skills_tool.invoke({
-            "text": state["job_description"],
-            "text_type": "job",
-            "api_key": state["api_key"],
-            "model": state["model"]
-        })
-        state["job_skills"] = result.get("skills", [])
-        state["agent_logs"].append(f"✓ Extracted {len(state['job_skills'])} skills from job description")
-        return state
-    except Exception as e:
-        state["agent_logs"].append(f"✗ Error extracting job skills: {str(e)}")
-        state["error"] = str(e)
-        return state
+        rag_system = state.get("rag_system")
 
+        def run_extraction(text: str, text_type: str) -> List[str]:
+            # Content-hash cached: re-optimizing the same CV against new jobs
+            # skips the CV-side extraction entirely
+            return cached_extract_skills(
+                text, text_type, state["api_key"], model=state["model"]
+            )
 
-def index_cv_in_rag(state: CVOptimizationState) -> CVOptimizationState:
-    """Node 2.5: Index CV in vector database"""
-    try:
-        if state.get("rag_system"):
-            indexing_info = state["rag_system"].index_cv(state["cv_text"], session_id="cv")
-            state["agent_logs"].append(f"✓ Indexed CV in vector database: {indexing_info['chunks_count']} chunks")
-            # Store indexing info for detailed logs
-            if not state.get("rag_details"):
-                state["rag_details"] = {}
-            state["rag_details"]["cv_indexing"] = indexing_info
-        else:
-            state["agent_logs"].append("⚠ RAG system not available, skipping CV indexing")
-        return state
-    except Exception as e:
-        state["agent_logs"].append(f"✗ Error indexing CV in RAG: {str(e)}")
-        return state
+        cv_index_future = None
+        jd_index_future = None
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            cv_future = executor.submit(run_extraction, state["cv_text"], "cv")
+            job_future = executor.submit(run_extraction, state["job_description"], "job")
+            if rag_system:
+                cv_index_future = executor.submit(rag_system.index_cv, state["cv_text"], session_id="cv")
+                jd_index_future = executor.submit(rag_system.index_jd, state["job_description"], session_id="jd")
+            cv_skills = cv_future.result()
+            job_skills = job_future.result()
 
+        logs.append(f"✓ Extracted {len(cv_skills)} skills from CV")
+        logs.append(f"✓ Extracted {len(job_skills)} skills from job description")
 
-def index_jd_in_rag(state: CVOptimizationState) -> CVOptimizationState:
-    """Node 3.5: Index Job Description in vector database"""
-    try:
-        if state.get("rag_system"):
-            indexing_info = state["rag_system"].index_jd(state["job_description"], session_id="jd")
-            state["agent_logs"].append(f"✓ Indexed job description in vector database: {indexing_info['chunks_count']} chunks")
-            # Store indexing info for detailed logs
-            if not state.get("rag_details"):
-                state["rag_details"] = {}
-            state["rag_details"]["jd_indexing"] = indexing_info
+        delta: Dict[str, Any] = {
+            "cv_skills": cv_skills,
+            "job_skills": job_skills,
+            "agent_logs": logs
+        }
+
+        # Indexing failures stay non-fatal, as before
+        if rag_system:
+            details: Dict[str, Any] = {}
+            try:
+                indexing_info = cv_index_future.result()
+                details["cv_indexing"] = indexing_info
+                logs.append(f"✓ Indexed CV in vector database: {indexing_info['chunks_count']} chunks")
+            except Exception as e:
+                logs.append(f"✗ Error indexing CV in RAG: {str(e)}")
+            try:
+                indexing_info = jd_index_future.result()
+                details["jd_indexing"] = indexing_info
+                logs.append(f"✓ Indexed job description in vector database: {indexing_info['chunks_count']} chunks")
+            except Exception as e:
+                logs.append(f"✗ Error indexing JD in RAG: {str(e)}")
+            if details:
+                delta["rag_details"] = details
         else:
-            state["agent_logs"].append("⚠ RAG system not available, skipping JD indexing")
-        return state
+            logs.append("⚠ RAG system not available, skipping RAG indexing")
+        return delta
     except Exception as e:
-        state["agent_logs"].append(f"✗ Error indexing JD in RAG: {str(e)}")
-        return state
+        logs.append(f"✗ Error extracting skills: {str(e)}")
+        return {"error": str(e), "agent_logs": logs}
 
 
-def compare_skills(state: CVOptimizationState) -> CVOptimizationState:
+def compare_skills(state: CVOptimizationState) -> Dict[str, Any]:
     """Node 4: Compare CV skills with job skills using RAG + cosine similarity"""
+    logs: List[str] = []
     try:
         rag_system = state.get("rag_system")
         cv_vectorstore = rag_system.cv_vectorstore if rag_system else None
@@ -147,7 +293,7 @@ def compare_skills(state: CVOptimizationState) -> CVOptimizationState:
                 "jd_vectorstore": jd_vectorstore,
                 "similarity_threshold": 0.7
             })
-            state["agent_logs"].append("✓ Compared skills using RAG + cosine similarity")
+            logs.append("✓ Compared skills using RAG + cosine similarity")
         else:
             # Fallback to original method
             result = compare_skills_tool.invoke({
@@ -158,28 +304,23 @@ def compare_skills(state: CVOptimizationState) -> CVOptimizationState:
                 "job_text": state["job_description"],
                 "model": state["model"]
             })
-            state["agent_logs"].append("✓ Compared skills using traditional method")
-        
-        state["skills_comparison"] = result
+            logs.append("✓ Compared skills using traditional method")
+
         matched_count = len(result.get("matched", []))
         missing_count = len(result.get("job_only", []))
-        state["agent_logs"].append(f"✓ Compared skills: {matched_count} matches, {missing_count} missing")
-        return state
+        logs.append(f"✓ Compared skills: {matched_count} matches, {missing_count} missing")
+        return {"skills_comparison": result, "agent_logs": logs}
     except Exception as e:
-        state["agent_logs"].append(f"✗ Error comparing skills: {str(e)}")
-        state["error"] = str(e)
-        return state
+        logs.append(f"✗ Error comparing skills: {str(e)}")
+        return {"error": str(e), "agent_logs": logs}
 
 
-def generate_optimized_cv(state: CVOptimizationState) -> CVOptimizationState:
+def generate_optimized_cv(state: CVOptimizationState) -> Dict[str, Any]:
     """Node 5: Generate optimized CV using LLM with RAG retrieval"""
+    logs: List[str] = []
+    retrieval_details: Optional[Dict[str, Any]] = None
     try:
-        
-        llm = ChatOpenAI(
-            model=state["model"],
-            temperature=state["temperature"],
-            api_key=state["api_key"]
-        )
+        llm = get_chat_model(state["model"], state["temperature"], state["api_key"])
         
         # Build context from previous steps
         cv_structure_info = ""
@@ -190,26 +331,17 @@ def generate_optimized_cv(state: CVOptimizationState) -> CVOptimizationState:
         skills_info = ""
         if state.get("skills_comparison"):
             comp = state["skills_comparison"]
-            matched = comp.get("matched", [])
-            missing = comp.get("job_only", [])
-            skills_info = f"""
-Skills Analysis:
-- Matching skills: {', '.join(matched[:10]) if matched else 'None'}
-- Missing skills: {', '.join(missing[:10]) if missing else 'None'}
-"""
-        
-        date_filter = ""
-        if state.get("max_date_years"):
-            date_filter = f"\n- Only include experiences from the last {state['max_date_years']} years"
+            matched = comp.get("matched") or []
+            missing = comp.get("job_only") or []
+            # Single join per line; empty lists fall back to 'None'
+            skills_lines = "\n".join(
+                f"- {label}: {', '.join(values[:10]) or 'None'}"
+                for label, values in (("Matching skills", matched),
+                                      ("Missing skills", missing))
+            )
+            skills_info = f"\nSkills Analysis:\n{skills_lines}\n"
         
-        exp_filter = f"\n- Include between {state['min_experiences']} and {state['max_experiences']} professional experiences"
-        
-        language_names = {
-            "fr": "French (Français)",
-            "en": "English",
-            "es": "Spanish (Español)"
-        }
-        target_language = language_names.get(state["language"], "French (Français)")
+        target_language = _LANGUAGE_NAMES.get(state["language"], "French (Français)")
         
         # RAG retrieval if available
         rag_context = ""
@@ -241,107 +373,100 @@ Relevant job requirements (from semantic search):
 
 IMPORTANT: Use information from the chunks above. These are the most relevant parts of the CV and job description for this optimization.
 """
-                    state["agent_logs"].append(f"✓ Retrieved {len(cv_sources)} CV chunks and {len(jd_sources)} JD chunks using RAG")
-                    
+                    logs.append(f"✓ Retrieved {len(cv_sources)} CV chunks and {len(jd_sources)} JD chunks using RAG")
+
                     # Store detailed RAG info for log
-                    if not state.get("rag_details"):
-                        state["rag_details"] = {}
-                    state["rag_details"]["retrieval"] = {
-                        "query": rag_result.get("query", state["job_description"]),
-                        "cv_chunks_details": rag_result.get("cv_chunks_details", []),
-                        "jd_chunks_details": rag_result.get("jd_chunks_details", []),
-                        "k_cv": 5,
-                        "k_jd": 3
+                    retrieval_details = {
+                        "retrieval": {
+                            "query": rag_result.get("query", state["job_description"]),
+                            "cv_chunks_details": rag_result.get("cv_chunks_details", []),
+                            "jd_chunks_details": rag_result.get("jd_chunks_details", []),
+                            "k_cv": 5,
+                            "k_jd": 3
+                        }
                     }
             except Exception as e:
-                state["agent_logs"].append(f"⚠ RAG retrieval failed: {str(e)}, using full text")
+                logs.append(f"⚠ RAG retrieval failed: {str(e)}, using full text")
                 rag_context = ""
         
-        system_message = f"""You are an expert CV/resume optimizer. Your task is to tailor a candidate's CV to match a specific job description while maintaining authenticity and truthfulness.
-
-CRITICAL: The entire CV must be written in {target_language}. All sections, descriptions, and content must be in this language.
-
-Guidelines:
-- Keep all information factual and accurate
-- Reorganize and rephrase content to highlight relevant skills and experiences
-- Use action verbs and quantify achievements where possible
-- Maintain professional formatting with clear sections
-- Ensure ATS (Applicant Tracking System) compatibility
-- Keep the same structure: Header, Summary, Experience, Education, Skills, etc.{date_filter}{exp_filter}
-- Focus on experiences and skills most relevant to the job
-- Remove or de-emphasize irrelevant information
-- Use industry-standard terminology from the job description where appropriate
-- Write everything in {target_language} - section headers, descriptions, and all text
-- When RAG context is provided, prioritize information from those chunks as they are the most relevant
-
-Use the skills analysis to emphasize matching skills and address missing skills naturally in the content."""
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_message),
-            ("human", """{rag_context}
-Job Description:
-{job_description}
-
-Original CV:
-{cv_text}
+        # Long CVs are windowed to the job-relevant lines so the prompt does
+        # not carry the full text on top of the RAG context and skills summary
+        cv_prompt_text, kept_lines, total_lines = _select_relevant_cv_lines(
+            state["cv_text"], state.get("job_skills") or []
+        )
+        if kept_lines < total_lines:
+            logs.append(f"✓ Windowed CV to {kept_lines}/{total_lines} job-relevant lines for the generation prompt")
 
-{cv_structure_info}
-{skills_info}
+        prompt = _get_generation_prompt(
+            target_language,
+            state["min_experiences"],
+            state["max_experiences"],
+            state.get("max_date_years")
+        )
 
-Create an optimized CV tailored to this job description. Maintain all factual information but reorganize and rephrase to maximize relevance and impact. If RAG context is provided, use it as the primary source of information.""")
-        ])
-        
         chain = prompt | llm
         
         # No individual callback config - the callback from graph level will handle tracing
-        # All nodes will create spans under the same trace automatically
-        response = chain.invoke({
+        # All nodes will create spans under the same trace automatically.
+        # Backoff on throttling: a 429 here would otherwise discard the
+        # successful extraction/comparison nodes that already ran
+        response = invoke_with_backoff(chain, {
             "rag_context": rag_context,
             "job_description": state["job_description"],
-            "cv_text": state["cv_text"],
+            "cv_text": cv_prompt_text,
             "cv_structure_info": cv_structure_info,
             "skills_info": skills_info
         })
         
-        state["optimized_cv"] = response.content.strip()
-        state["sources"] = {
-            "cv_sources": cv_sources,
-            "jd_sources": jd_sources
+        optimized_cv = response.content.strip()
+        logs.append(f"✓ Generated optimized CV ({_word_count(optimized_cv)} words) with RAG context")
+        delta: Dict[str, Any] = {
+            "optimized_cv": optimized_cv,
+            "sources": {
+                "cv_sources": cv_sources,
+                "jd_sources": jd_sources
+            },
+            "agent_logs": logs
         }
-        state["agent_logs"].append(f"✓ Generated optimized CV ({len(state['optimized_cv'].split())} words) with RAG context")
-        return state
-        
+        if retrieval_details:
+            delta["rag_details"] = retrieval_details
+        return delta
+
     except Exception as e:
-        state["agent_logs"].append(f"✗ Error generating CV: {str(e)}")
-        state["error"] = str(e)
-        return state
+        logs.append(f"✗ Error generating CV: {str(e)}")
+        delta = {"error": str(e), "agent_logs": logs}
+        if retrieval_details:
+            delta["rag_details"] = retrieval_details
+        return delta
+
 
+def create_cv_optimization_agent(use_structure_analysis: bool = False) -> StateGraph:
+    """Create the LangGraph workflow for CV optimization with RAG.
 
-def create_cv_optimization_agent() -> StateGraph:
-    """Create the LangGraph workflow for CV optimization with RAG"""
+    Structure analysis is opt-in: its only output is a short comma-joined
+    section list in the generation prompt — a signal the LLM infers from the
+    raw CV anyway — so by default the workflow starts directly at skill
+    extraction and saves one serial step on the critical path.
+    """
     workflow = StateGraph(CVOptimizationState)
-    
+
     # Nodes for the workflow
-    workflow.add_node("analyze_structure", analyze_structure)
-    workflow.add_node("extract_cv_skills", extract_cv_skills)
-    workflow.add_node("index_cv_rag", index_cv_in_rag)
-    workflow.add_node("extract_job_skills", extract_job_skills)
-    workflow.add_node("index_jd_rag", index_jd_in_rag)
+    if use_structure_analysis:
+        workflow.add_node("analyze_structure", analyze_structure)
+    workflow.add_node("extract_skills", extract_and_index)
     workflow.add_node("compare_skills", compare_skills)
     workflow.add_node("generate_cv", generate_optimized_cv)
-    
-    # Entry point for the workflow
-    workflow.set_entry_point("analyze_structure")
-    
-    # Adding edges for the workflow
-    workflow.add_edge("analyze_structure", "extract_cv_skills")
-    workflow.add_edge("extract_cv_skills", "index_cv_rag")
-    workflow.add_edge("index_cv_rag", "extract_job_skills")
-    workflow.add_edge("extract_job_skills", "index_jd_rag")
-    workflow.add_edge("index_jd_rag", "compare_skills")
+
+    # Entry point and edges for the workflow
+    if use_structure_analysis:
+        workflow.set_entry_point("analyze_structure")
+        workflow.add_edge("analyze_structure", "extract_skills")
+    else:
+        workflow.set_entry_point("extract_skills")
+    workflow.add_edge("extract_skills", "compare_skills")
     workflow.add_edge("compare_skills", "generate_cv")
     workflow.add_edge("generate_cv", END)
-    
+
     return workflow.compile()
 
 
@@ -357,10 +482,11 @@ def optimize_cv_with_agent(
     language: str = "fr",
     rag_system: Optional[Any] = None,
     session_id: Optional[str] = None,
+    use_structure_analysis: bool = False,
 ) -> Dict[str, Any]:
     """
     Optimize CV using the agent-based workflow.
-    
+
     Returns:
         Dictionary with optimized_cv, agent_logs, and metadata
     """
@@ -387,8 +513,8 @@ def optimize_cv_with_agent(
         "session_id": session_id or "default"
     }
     
-    agent = create_cv_optimization_agent()
-    
+    agent = create_cv_optimization_agent(use_structure_analysis)
+
     # LangGraph tracer for unified trace (all nodes in one trace)
     trace_input = {
         "cv_text_length": len(cv_text),
@@ -444,7 +570,7 @@ def optimize_cv_with_agent(
             try:
                 trace_output = {
                     "optimized_cv_length": len(final_state.get("optimized_cv", "")),
-                    "word_count": len(final_state.get("optimized_cv", "").split()),
+                    "word_count": _word_count(final_state.get("optimized_cv", "")),
                     "cv_skills_count": len(final_state.get("cv_skills", [])),
                     "job_skills_count": len(final_state.get("job_skills", [])),
                     "has_error": final_state.get("error") is not None
@@ -459,86 +585,163 @@ def optimize_cv_with_agent(
                 "optimized_cv": None,
                 "agent_logs": final_state.get("agent_logs", [])
             }
-        
-        # Build graph structure information
-        graph_structure = {
-            "nodes": [
-                {
-                    "id": "analyze_structure",
-                    "name": "Analyze Structure",
-                    "description": "Analyzes CV structure and identifies sections",
-                    "tools": ["analyze_cv_structure_tool"]
-                },
-                {
-                    "id": "extract_cv_skills",
-                    "name": "Extract CV Skills",
-                    "description": "Extracts skills from the CV text",
-                    "tools": ["extract_skills_tool"]
-                },
-                {
-                    "id": "index_cv_rag",
-                    "name": "Index CV in RAG",
-                    "description": "Indexes CV chunks in vector database",
-                    "tools": []
-                },
-                {
-                    "id": "extract_job_skills",
-                    "name": "Extract Job Skills",
-                    "description": "Extracts required skills from job description",
-                    "tools": ["extract_skills_tool"]
-                },
-                {
-                    "id": "index_jd_rag",
-                    "name": "Index JD in RAG",
-                    "description": "Indexes job description chunks in vector database",
-                    "tools": []
-                },
-                {
-                    "id": "compare_skills",
-                    "name": "Compare Skills",
-                    "description": "Compares CV and job skills, identifies matches and gaps",
-                    "tools": ["compare_skills_tool", "compare_skills_tool_with_rag"]
-                },
-                {
-                    "id": "generate_cv",
-                    "name": "Generate Optimized CV",
-                    "description": "Generates the final optimized CV using LLM",
-                    "tools": []
-                }
-            ],
-            "edges": [
-                {"from": "analyze_structure", "to": "extract_cv_skills"},
-                {"from": "extract_cv_skills", "to": "index_cv_rag"},
-                {"from": "index_cv_rag", "to": "extract_job_skills"},
-                {"from": "extract_job_skills", "to": "index_jd_rag"},
-                {"from": "index_jd_rag", "to": "compare_skills"},
-                {"from": "compare_skills", "to": "generate_cv"}
-            ],
-            "execution_order": ["analyze_structure", 
-                                "extract_cv_skills", 
-                                "index_cv_rag", 
-                                "extract_job_skills", 
-                                "index_jd_rag", 
-                                "compare_skills", 
-                                "generate_cv"]
-        }
-        
-        return {
-            "optimized_cv": final_state.get("optimized_cv"),
-            "agent_logs": final_state.get("agent_logs", []),
-            "cv_skills": final_state.get("cv_skills", []),
-            "job_skills": final_state.get("job_skills", []),
-            "skills_comparison": final_state.get("skills_comparison"),
-            "sources": final_state.get("sources"),
-            "rag_details": final_state.get("rag_details"),
-            "graph_structure": graph_structure,
-            "model_used": model,
-            "temperature": temperature,
-            "word_count": len(final_state.get("optimized_cv", "").split()) if final_state.get("optimized_cv") else 0
-        }
+
+        return _build_result(final_state, model, temperature, use_structure_analysis)
     except Exception as e:
         return {
             "error": str(e),
             "optimized_cv": None,
             "agent_logs": ["✗ Agent execution failed"]
-        }
\ No newline at end of file
+        }
+
+
+# Static description of the workflow, returned to the UI for visualization
+GRAPH_STRUCTURE = {
+    "nodes": [
+        {
+            "id": "analyze_structure",
+            "name": "Analyze Structure",
+            "description": "Analyzes CV structure and identifies sections",
+            "tools": ["analyze_cv_structure_tool"]
+        },
+        {
+            "id": "extract_skills",
+            "name": "Extract Skills & Index",
+            "description": "Extracts CV and job skills and indexes both texts in the vector database, all concurrently",
+            "tools": ["extract_skills_tool"]
+        },
+        {
+            "id": "compare_skills",
+            "name": "Compare Skills",
+            "description": "Compares CV and job skills, identifies matches and gaps",
+            "tools": ["compare_skills_tool", "compare_skills_tool_with_rag"]
+        },
+        {
+            "id": "generate_cv",
+            "name": "Generate Optimized CV",
+            "description": "Generates the final optimized CV using LLM",
+            "tools": []
+        }
+    ],
+    "edges": [
+        {"from": "analyze_structure", "to": "extract_skills"},
+        {"from": "extract_skills", "to": "compare_skills"},
+        {"from": "compare_skills", "to": "generate_cv"}
+    ],
+    "execution_order": ["analyze_structure",
+                        "extract_skills",
+                        "compare_skills",
+                        "generate_cv"]
+}
+
+# Variant shown when the opt-in structure analysis node is skipped
+_GRAPH_STRUCTURE_NO_ANALYZE = {
+    "nodes": [n for n in GRAPH_STRUCTURE["nodes"] if n["id"] != "analyze_structure"],
+    "edges": [e for e in GRAPH_STRUCTURE["edges"] if e["from"] != "analyze_structure"],
+    "execution_order": [n for n in GRAPH_STRUCTURE["execution_order"] if n != "analyze_structure"]
+}
+
+
+def _build_result(
+    final_state: Dict[str, Any],
+    model: str,
+    temperature: float,
+    use_structure_analysis: bool = False
+) -> Dict[str, Any]:
+    """Build the success result payload from the final agent state."""
+    return {
+        "optimized_cv": final_state.get("optimized_cv"),
+        "agent_logs": final_state.get("agent_logs", []),
+        "cv_skills": final_state.get("cv_skills", []),
+        "job_skills": final_state.get("job_skills", []),
+        "skills_comparison": final_state.get("skills_comparison"),
+        "sources": final_state.get("sources"),
+        "rag_details": final_state.get("rag_details"),
+        "graph_structure": GRAPH_STRUCTURE if use_structure_analysis else _GRAPH_STRUCTURE_NO_ANALYZE,
+        "model_used": model,
+        "temperature": temperature,
+        "word_count": _word_count(final_state.get("optimized_cv") or "")
+    }
+
+
+def stream_cv_optimization(
+    cv_text: str,
+    job_description: str,
+    api_key: str,
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.3,
+    min_experiences: int = 3,
+    max_experiences: int = 8,
+    max_date_years: Optional[int] = None,
+    language: str = "fr",
+    rag_system: Optional[Any] = None,
+    session_id: Optional[str] = None,
+    use_structure_analysis: bool = False,
+):
+    """
+    Run the optimization workflow and yield one progress event per node.
+
+    Yields dictionaries: {"event": "node_completed", ...} after each graph
+    node, then a final {"event": "result", "data": <same payload as
+    optimize_cv_with_agent>} or {"event": "error", "error": ...}.
+    """
+    initial_state: CVOptimizationState = {
+        "cv_text": cv_text,
+        "job_description": job_description,
+        "api_key": api_key,
+        "model": model,
+        "temperature": temperature,
+        "language": language,
+        "min_experiences": min_experiences,
+        "max_experiences": max_experiences,
+        "max_date_years": max_date_years,
+        "cv_structure": None,
+        "cv_skills": [],
+        "job_skills": [],
+        "skills_comparison": None,
+        "rag_system": rag_system,
+        "optimized_cv": None,
+        "sources": None,
+        "rag_details": None,
+        "error": None,
+        "agent_logs": [],
+        "session_id": session_id or "default"
+    }
+
+    agent = create_cv_optimization_agent(use_structure_analysis)
+    final_state: Dict[str, Any] = dict(initial_state)
+
+    try:
+        for update in agent.stream(initial_state):
+            for node_name, node_delta in update.items():
+                if isinstance(node_delta, dict):
+                    # Mirror the graph reducers: logs accumulate, rag_details
+                    # merge, everything else is last-write-wins
+                    for key, value in node_delta.items():
+                        if key == "agent_logs":
+                            final_state["agent_logs"] = final_state["agent_logs"] + value
+                        elif key == "rag_details":
+                            final_state["rag_details"] = _merge_rag_details(
+                                final_state.get("rag_details"), value
+                            )
+                        else:
+                            final_state[key] = value
+                yield {
+                    "event": "node_completed",
+                    "node": node_name,
+                    "agent_logs": final_state.get("agent_logs", [])
+                }
+
+        if final_state.get("error"):
+            yield {
+                "event": "error",
+                "error": final_state["error"],
+                "agent_logs": final_state.get("agent_logs", [])
+            }
+        else:
+            yield {
+                "event": "result",
+                "data": _build_result(final_state, model, temperature, use_structure_analysis)
+            }
+    except Exception as e:
+        yield {"event": "error", "error": str(e), "agent_logs": ["✗ Agent execution failed"]}
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Numerical kernels for skill matching and RAG scoring
+JIT-compiled with Numba when installed; plain NumPy (already BLAS-backed
+for the matmul) otherwise.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # No-op decorator so the kernels run as regular NumPy code
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _normalize_rows(matrix):
+        """Normalize each row to unit length (zero rows left untouched)."""
+        out = np.empty_like(matrix)
+        for i in range(matrix.shape[0]):
+            norm = 0.0
+            for j in range(matrix.shape[1]):
+                norm += matrix[i, j] * matrix[i, j]
+            norm = norm ** 0.5
+            if norm == 0.0:
+                norm = 1.0
+            for j in range(matrix.shape[1]):
+                out[i, j] = matrix[i, j] / norm
+        return out
+else:
+    def _normalize_rows(matrix):
+        """Normalize each row to unit length (zero rows left untouched)."""
+        # Vectorized: the scalar loop above is only worthwhile once JITted
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0.0, 1.0, norms)
+
+
+def _encode_fixed_width(keys):
+    """Encode strings as a zero-padded uint8 matrix plus a lengths vector."""
+    data = [key.encode("utf-8") for key in keys]
+    width = max((len(d) for d in data), default=1) or 1
+    out = np.zeros((len(data), width), dtype=np.uint8)
+    lengths = np.empty(len(data), dtype=np.int64)
+    for i, d in enumerate(data):
+        out[i, :len(d)] = np.frombuffer(d, dtype=np.uint8)
+        lengths[i] = len(d)
+    return out, lengths
+
+
+@njit(cache=True)
+def _is_substring(s_bytes, si, s_len, t_bytes, ti, t_len):
+    """Whether row si of s_bytes occurs inside row ti of t_bytes."""
+    if s_len == 0:
+        return True
+    for start in range(t_len - s_len + 1):
+        found = True
+        for k in range(s_len):
+            if t_bytes[ti, start + k] != s_bytes[si, k]:
+                found = False
+                break
+        if found:
+            return True
+    return False
+
+
+@njit(cache=True)
+def _containment_kernel(a_bytes, a_len, b_bytes, b_len):
+    """Pairwise match matrix: 2 for equal rows, 1 for containment, 0 otherwise."""
+    out = np.zeros((a_bytes.shape[0], b_bytes.shape[0]), dtype=np.int8)
+    for i in range(a_bytes.shape[0]):
+        for j in range(b_bytes.shape[0]):
+            if a_len[i] == b_len[j]:
+                equal = True
+                for k in range(a_len[i]):
+                    if a_bytes[i, k] != b_bytes[j, k]:
+                        equal = False
+                        break
+                if equal:
+                    out[i, j] = 2
+            elif a_len[i] < b_len[j]:
+                if _is_substring(a_bytes, i, a_len[i], b_bytes, j, b_len[j]):
+                    out[i, j] = 1
+            else:
+                if _is_substring(b_bytes, j, b_len[j], a_bytes, i, a_len[i]):
+                    out[i, j] = 1
+    return out
+
+
+def containment_match_matrix(a_keys, b_keys) -> np.ndarray:
+    """
+    Pairwise equality/containment matrix between two lists of strings.
+
+    Args:
+        a_keys: List of normalized (lowercased, stripped) strings
+        b_keys: List of normalized strings
+
+    Returns:
+        np.ndarray of shape [len(a_keys), len(b_keys)] with int8 values:
+        2 where a == b, 1 where one string contains the other, 0 otherwise
+    """
+    if not NUMBA_AVAILABLE or not a_keys or not b_keys:
+        # Python's substring operator beats an un-JITted byte loop
+        out = np.zeros((len(a_keys), len(b_keys)), dtype=np.int8)
+        for i, a in enumerate(a_keys):
+            for j, b in enumerate(b_keys):
+                if a == b:
+                    out[i, j] = 2
+                elif a in b or b in a:
+                    out[i, j] = 1
+        return out
+    a_bytes, a_len = _encode_fixed_width(a_keys)
+    b_bytes, b_len = _encode_fixed_width(b_keys)
+    return _containment_kernel(a_bytes, a_len, b_bytes, b_len)
+
+
+def pairwise_cosine(a, b) -> np.ndarray:
+    """
+    Cosine similarity matrix between the rows of a and b.
+
+    Args:
+        a: Array-like of shape [n, d]
+        b: Array-like of shape [m, d]
+
+    Returns:
+        np.ndarray of shape [n, m] with values in [-1, 1]
+    """
+    a = np.ascontiguousarray(a, dtype=np.float64)
+    b = np.ascontiguousarray(b, dtype=np.float64)
+    return _normalize_rows(a) @ _normalize_rows(b).T
@@ -0,0 +1,20 @@
+"""
+Content hashing helper for cache keys
+Uses blake3 (SIMD-accelerated, ~5-10x faster than sha256 on CV-sized
+inputs) when installed, falling back to hashlib.sha256.
+"""
+import hashlib
+
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    blake3 = None
+    BLAKE3_AVAILABLE = False
+
+
+def content_hash(data: bytes) -> str:
+    """Hex digest of data using the fastest available hash."""
+    if BLAKE3_AVAILABLE:
+        return blake3.blake3(data).hexdigest()
+    return hashlib.sha256(data).hexdigest()
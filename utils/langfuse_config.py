@@ -1,6 +1,7 @@
 """
 Langfuse configuration for LLM observability and Debug mode
 """
+import atexit
 import os
 from typing import Optional, Dict, Any
 
@@ -57,6 +58,23 @@ def init_langfuse_client() -> Optional[Any]:
         _langfuse_enabled = False
         return None
 
+def _flush_langfuse_at_exit():
+    """Drain the SDK's background ingestion queue on process shutdown.
+
+    Trace export already happens off the request path (the Langfuse SDK
+    batches events on its own ingestion thread); this only ensures events
+    still queued there are delivered before the process exits.
+    """
+    if _langfuse_client is not None:
+        try:
+            _langfuse_client.flush()
+        except Exception as e:
+            print(f"Langfuse flush at exit failed: {e}")
+
+
+atexit.register(_flush_langfuse_at_exit)
+
+
 def is_langfuse_enabled() -> bool:
     """Check if Langfuse is configured and available"""
     global _langfuse_enabled
@@ -1,11 +1,57 @@
 """
 Cover Letter Generator - Creates personalized, natural-sounding cover letters
 """
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from typing import Dict, Any
 import re
 from utils.langfuse_config import create_langfuse_callback
+from utils.llm_client import get_chat_model
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+
+_INVALID_KEY_MESSAGE = (
+    "Error: Invalid OpenAI API key.\n\n"
+    "Your API key is invalid or has expired. Please:\n"
+    "1. Verify that you have copied the entire key\n"
+    "2. Obtain a new key at: https://platform.openai.com/account/api-keys\n"
+    "3. Verify that your OpenAI account has available credits"
+)
+_RATE_LIMIT_MESSAGE = (
+    "Error: Rate limit exceeded.\n\n"
+    "You have made too many requests. Please wait a few moments before trying again."
+)
+_BILLING_MESSAGE = (
+    "Error: Insufficient credits.\n\n"
+    "Your OpenAI account has no credits left."
+    "Please add credits at: https://platform.openai.com/account/billing"
+)
+
+# Hot-path lookup tables, built once at import instead of per call
+_LANGUAGE_NAMES = {
+    "fr": "French (Français)",
+    "en": "English",
+    "es": "Spanish (Español)"
+}
+_LANGUAGE_GUIDELINES = {
+    "fr": "- Use appropriate French business letter conventions\n- Use 'Madame, Monsieur' or 'Madame, Monsieur le Directeur' for formal openings\n- Use 'Cordialement' or 'Bien cordialement' for closings",
+    "en": "- Use appropriate English business letter conventions\n- Use 'Dear [Name]' or 'Dear Hiring Manager' for openings\n- Use 'Sincerely' or 'Best regards' for closings",
+    "es": "- Use appropriate Spanish business letter conventions\n- Use 'Estimado/a [Nombre]' or 'A quien corresponda' for openings\n- Use 'Atentamente' or 'Saludos cordiales' for closings"
+}
+
+# Typed dispatch table, checked in order; isinstance classification is exact
+# where the old substring checks could mismatch (e.g. "500" in a request id)
+if openai is not None:
+    _ERROR_MAP = (
+        (openai.AuthenticationError, (401, _INVALID_KEY_MESSAGE)),
+        (openai.PermissionDeniedError, (401, _INVALID_KEY_MESSAGE)),
+        (openai.RateLimitError, (429, _RATE_LIMIT_MESSAGE)),
+    )
+else:
+    _ERROR_MAP = ()
 
 
 def parse_openai_error(error: Exception) -> Dict[str, Any]:
@@ -13,30 +59,36 @@ def parse_openai_error(error: Exception) -> Dict[str, Any]:
     error_str = str(error)
     error_code = None
     user_message = "An error occurred while calling your OpenAI API."
-    
-    if "401" in error_str or "invalid_api_key" in error_str.lower() or "Incorrect API key" in error_str:
-        error_code = 401
-        user_message = (
-            "Error: Invalid OpenAI API key.\n\n"
-            "Your API key is invalid or has expired. Please:\n"
-            "1. Verify that you have copied the entire key\n"
-            "2. Obtain a new key at: https://platform.openai.com/account/api-keys\n"
-            "3. Verify that your OpenAI account has available credits"
-        )
-    elif "429" in error_str or "rate_limit" in error_str.lower():
-        error_code = 429
-        user_message = (
-            "Error: Rate limit exceeded.\n\n"
-            "You have made too many requests. Please wait a few moments before trying again."
-        )
-    elif "insufficient_quota" in error_str.lower() or "billing" in error_str.lower():
+
+    # insufficient_quota surfaces as a RateLimitError whose code says billing,
+    # so the code check must come before the typed map
+    if getattr(error, "code", None) == "insufficient_quota":
         error_code = "billing"
-        user_message = (
-            "Error: Insufficient credits.\n\n"
-            "Your OpenAI account has no credits left."
-            "Please add credits at: https://platform.openai.com/account/billing"
-        )
-    
+        user_message = _BILLING_MESSAGE
+        return {
+            "error_code": error_code,
+            "error_message": error_str,
+            "user_message": user_message
+        }
+
+    for exc_type, (code, message) in _ERROR_MAP:
+        if isinstance(error, exc_type):
+            error_code = code
+            user_message = message
+            break
+    else:
+        # String fallback: errors wrapped or re-raised by LangChain lose
+        # their openai type, so keep the old substring triage for those
+        if "401" in error_str or "invalid_api_key" in error_str.lower() or "Incorrect API key" in error_str:
+            error_code = 401
+            user_message = _INVALID_KEY_MESSAGE
+        elif "429" in error_str or "rate_limit" in error_str.lower():
+            error_code = 429
+            user_message = _RATE_LIMIT_MESSAGE
+        elif "insufficient_quota" in error_str.lower() or "billing" in error_str.lower():
+            error_code = "billing"
+            user_message = _BILLING_MESSAGE
+
     return {
         "error_code": error_code,
         "error_message": error_str,
@@ -67,29 +119,16 @@ def generate_cover_letter(
     )
     
     callbacks = [langfuse_callback] if langfuse_callback else None
-    
-    llm = ChatOpenAI(
-        model=model,
-        temperature=temperature,
-        api_key=api_key,
-        callbacks=callbacks
-    )
+
+    # Shared client: callbacks go through the invoke config instead of the
+    # constructor so the cached instance stays callback-free
+    llm = get_chat_model(model, temperature, api_key)
     
     target_words = round(target_words / 10) * 10
     
-    language_names = {
-        "fr": "French (Français)",
-        "en": "English",
-        "es": "Spanish (Español)"
-    }
-    target_language = language_names.get(language, "French (Français)")
-    
-    language_guidelines = {
-        "fr": "- Use appropriate French business letter conventions\n- Use 'Madame, Monsieur' or 'Madame, Monsieur le Directeur' for formal openings\n- Use 'Cordialement' or 'Bien cordialement' for closings",
-        "en": "- Use appropriate English business letter conventions\n- Use 'Dear [Name]' or 'Dear Hiring Manager' for openings\n- Use 'Sincerely' or 'Best regards' for closings",
-        "es": "- Use appropriate Spanish business letter conventions\n- Use 'Estimado/a [Nombre]' or 'A quien corresponda' for openings\n- Use 'Atentamente' or 'Saludos cordiales' for closings"
-    }
-    lang_guidelines = language_guidelines.get(language, language_guidelines["fr"])
+    target_language = _LANGUAGE_NAMES.get(language, _LANGUAGE_NAMES["fr"])
+
+    lang_guidelines = _LANGUAGE_GUIDELINES.get(language, _LANGUAGE_GUIDELINES["fr"])
     
     system_message = f"""You are a professional writer helping someone write a cover letter. Your goal is to create a letter that sounds completely natural and human-written, NOT AI-generated.
 
@@ -132,13 +171,14 @@ Write everything in {target_language}.""")
     chain = prompt | llm
     
     try:
+        invoke_config = {"callbacks": callbacks} if callbacks else {}
         response = chain.invoke({
             "job_description": job_description,
             "cv_text": cv_text,
             "optimized_cv": optimized_cv,
             "target_words": target_words,
             "target_language": target_language
-        })
+        }, config=invoke_config)
         
         cover_letter = response.content.strip()
         word_count = len(cover_letter.split())
@@ -0,0 +1,146 @@
+"""
+Shared ChatOpenAI client cache
+LangChain chat models are stateless between calls, so one instance per
+(model, temperature, api_key) can serve every request: this skips client
+construction on the hot path and keeps the underlying httpx connection
+pool (TLS session, keep-alive) warm across requests.
+"""
+from functools import lru_cache
+from langchain_openai import ChatOpenAI
+
+import os
+import random
+import time
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+# Process-wide LLM response cache: identical (model, params, prompt) calls —
+# common in ReAct loops and user re-edits — return from local SQLite in
+# microseconds instead of a 500-2000ms API round-trip. Disable by setting
+# LLM_CACHE_PATH to an empty string.
+_LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".langchain_cache.db")
+if _LLM_CACHE_PATH:
+    try:
+        from langchain_core.globals import set_llm_cache
+        from langchain_community.cache import SQLiteCache
+        set_llm_cache(SQLiteCache(database_path=_LLM_CACHE_PATH))
+    except ImportError:
+        pass
+
+try:
+    import httpx
+    # One connection pool for every OpenAI client in the process, so keep-alive
+    # connections are reused even across different (model, temperature) combos
+    _shared_http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+    )
+except ImportError:
+    _shared_http_client = None
+
+
+def get_shared_http_client():
+    """Get the process-wide httpx client, or None if httpx is unavailable."""
+    return _shared_http_client
+
+
+@lru_cache(maxsize=4)
+def _get_encoder(model: str):
+    """Get (once per model) the tiktoken encoder; encoders are costly to build."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """
+    Truncate text to an exact token budget instead of a character count.
+
+    Character slicing can cut mid-token and over- or under-shoots the
+    intended budget; slicing the encoded tokens hits it exactly. Falls back
+    to a ~4-chars-per-token estimate when tiktoken is unavailable.
+    """
+    if tiktoken is None:
+        return text[:max_tokens * 4]
+    encoder = _get_encoder(model)
+    tokens = encoder.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoder.decode(tokens[:max_tokens])
+
+
+# Workflow-level retry budget for transient OpenAI failures
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+
+
+def _is_retryable_error(error: Exception) -> bool:
+    """Whether an LLM call failure is transient (throttling / 5xx)."""
+    # Quota exhaustion never clears on its own — fail fast
+    if getattr(error, "code", None) == "insufficient_quota":
+        return False
+    if openai is not None and isinstance(error, openai.APIError):
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+            return True
+        status = getattr(error, "status_code", None)
+        return isinstance(status, int) and status >= 500
+    # Wrapped / non-openai errors: fall back to message inspection
+    error_str = str(error).lower()
+    return "rate limit" in error_str or "rate_limit" in error_str or "429" in error_str
+
+
+def invoke_with_backoff(runnable, payload, config=None, max_retries=None):
+    """
+    Invoke a runnable, retrying transient failures with exponential backoff.
+
+    Sleeps 2**attempt plus jitter (capped at 30s) between attempts, so
+    provider throttling turns into transparent recovery instead of failing
+    the whole workflow; non-transient errors propagate immediately.
+
+    Args:
+        runnable: Any LangChain runnable (chain, model, ...)
+        payload: The invoke input
+        config: Optional invoke config (callbacks etc.)
+        max_retries: Retry budget; defaults to LLM_MAX_RETRIES
+
+    Returns:
+        The runnable's result
+    """
+    if max_retries is None:
+        max_retries = LLM_MAX_RETRIES
+    attempt = 0
+    while True:
+        try:
+            if config is not None:
+                return runnable.invoke(payload, config=config)
+            return runnable.invoke(payload)
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable_error(e):
+                raise
+            time.sleep(min(2 ** attempt + random.random(), 30.0))
+            attempt += 1
+
+
+@lru_cache(maxsize=32)
+def get_chat_model(model: str, temperature: float, api_key: str) -> ChatOpenAI:
+    """
+    Get (or lazily create) the shared chat model for these parameters.
+
+    Callbacks must be passed per-invocation via config={"callbacks": [...]}
+    rather than bound at construction, since the instance is shared.
+    """
+    kwargs = {
+        "model": model,
+        "temperature": temperature,
+        "api_key": api_key
+    }
+    if _shared_http_client is not None:
+        kwargs["http_client"] = _shared_http_client
+    return ChatOpenAI(**kwargs)
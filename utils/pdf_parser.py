@@ -1,50 +1,116 @@
 """
 Utility to extract text from PDF files
 """
-import PyPDF2
-import pdfplumber
+import os
 from io import BytesIO
 from typing import Optional
 
+from utils.hashing import content_hash
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    fitz = None
+    PYMUPDF_AVAILABLE = False
+
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PyPDF2 = None
+    PYPDF2_AVAILABLE = False
+
+try:
+    import pdfplumber
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    pdfplumber = None
+    PDFPLUMBER_AVAILABLE = False
+
+# Backend selection via environment (pymupdf is the fast default,
+# pdfplumber/pypdf2 kept as pure-Python fallbacks for AGPL-sensitive deployments)
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pymupdf").lower()
+
+# Extraction is deterministic in the PDF bytes, so re-uploads of the same
+# file (common while users iterate on a job description) skip the parse
+_extraction_cache = {}  # {content_hash: extracted_text}
+EXTRACTION_CACHE_MAX_ENTRIES = 128
+
+
+def _extract_with_pymupdf(pdf_bytes: bytes) -> str:
+    """Extract text using PyMuPDF (fitz) - 5-30x faster than pure-Python parsers."""
+    text_parts = []
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for page in doc:
+            page_text = page.get_text("text")
+            if page_text:
+                text_parts.append(page_text)
+    return "\n".join(text_parts)
+
+
+def _extract_with_pdfplumber(pdf_bytes: bytes) -> str:
+    """Extract text using pdfplumber."""
+    text = ""
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return text
+
+
+def _extract_with_pypdf2(pdf_bytes: bytes) -> str:
+    """Extract text using PyPDF2."""
+    text = ""
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    for page in pdf_reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            text += page_text + "\n"
+    return text
+
 
 def extract_text_from_pdf(pdf_file) -> str:
     """
-    Extract text from a PDF file using multiple methods for better accuracy.
-    
+    Extract text from a PDF file using the fastest available backend.
+
     Args:
         pdf_file: File-like object or bytes
-        
+
     Returns:
         Extracted text as string
     """
-    text = ""
-    
-    try:
-        if isinstance(pdf_file, bytes):
-            pdf_file = BytesIO(pdf_file)
-        
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        
-        if text.strip():
-            return text.strip()
-    except Exception as e:
-        print(f"pdfplumber failed: {e}")
-    
-    # Fallback to PyPDF2
-    try:
-        if isinstance(pdf_file, bytes):
-            pdf_file = BytesIO(pdf_file)
-        
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    except Exception as e:
-        print(f"PyPDF2 failed: {e}")
-    
-    return text.strip() if text else ""
\ No newline at end of file
+    if not isinstance(pdf_file, bytes):
+        pdf_file = pdf_file.read()
+
+    cache_key = content_hash(pdf_file)
+    cached = _extraction_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Ordered list of backends: preferred one first, others as fallbacks
+    backends = []
+    if PYMUPDF_AVAILABLE:
+        backends.append(("pymupdf", _extract_with_pymupdf))
+    if PDFPLUMBER_AVAILABLE:
+        backends.append(("pdfplumber", _extract_with_pdfplumber))
+    if PYPDF2_AVAILABLE:
+        backends.append(("pypdf2", _extract_with_pypdf2))
+
+    # Honor PDF_BACKEND env var by moving the requested backend first
+    backends.sort(key=lambda b: b[0] != PDF_BACKEND)
+
+    for name, extractor in backends:
+        try:
+            text = extractor(pdf_file)
+            if text.strip():
+                text = text.strip()
+                if len(_extraction_cache) >= EXTRACTION_CACHE_MAX_ENTRIES:
+                    _extraction_cache.pop(next(iter(_extraction_cache)))
+                _extraction_cache[cache_key] = text
+                return text
+        except Exception as e:
+            print(f"{name} failed: {e}")
+
+    return ""
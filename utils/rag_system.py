@@ -3,6 +3,7 @@ RAG System for CV Optimizer
 Handles vectorization, storage, and semantic search of CVs and Job Descriptions
 """
 from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 try:
@@ -40,27 +41,68 @@ except ImportError:
 import os
 import tempfile
 import shutil
+import numpy as np
+
+
+# Chroma's underlying index is HNSW; these parameters tune it explicitly so
+# queries stay sub-linear as indexed chunks grow. Cosine space matches the
+# similarity normalization done in retrieve_with_scores.
+HNSW_INDEX_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 64,
+}
+
+# Max cached retrievals per RAGSystem (repeated/identical queries are common
+# in chat refinement loops; a hit skips the query embedding and both searches)
+RETRIEVAL_CACHE_MAX_ENTRIES = 512
+
+# Second tier under the exact-match cache: paraphrased queries ("remove Python
+# from skills" vs "delete Python skill") reuse the prior retrieval when their
+# embeddings' cosine similarity exceeds the threshold
+SEMANTIC_QUERY_THRESHOLD = 0.95
+SEMANTIC_QUERY_CACHE_MAX_ENTRIES = 200
+
+# Shared embeddings clients keyed by API key. OpenAIEmbeddings holds an HTTP
+# connection pool, so creating one per session wastes sockets and setup time;
+# one client per API key serves every session's RAGSystem. Bounded (FIFO)
+# because keys are user-supplied: an evicted key just gets a fresh client.
+SHARED_EMBEDDINGS_MAX_ENTRIES = 256
+_shared_embeddings: Dict[str, OpenAIEmbeddings] = {}
+
+
+def get_shared_embeddings(api_key: str) -> OpenAIEmbeddings:
+    """Get (or lazily create) the shared embeddings client for an API key."""
+    if api_key not in _shared_embeddings:
+        if len(_shared_embeddings) >= SHARED_EMBEDDINGS_MAX_ENTRIES:
+            _shared_embeddings.pop(next(iter(_shared_embeddings)))
+        _shared_embeddings[api_key] = OpenAIEmbeddings(
+            model="text-embedding-3-small",
+            api_key=api_key,
+            # Send up to 512 texts per API call when indexing multi-chunk
+            # documents, instead of many small round-trips
+            chunk_size=512
+        )
+    return _shared_embeddings[api_key]
 
 
 class RAGSystem:
     """
     RAG System for managing vectorized documents (CVs and Job Descriptions)
     """
-    
+
     def __init__(self, api_key: str, persist_directory: Optional[str] = None):
         """
         Initialize RAG system with embeddings and vector store.
-        
+
         Args:
             api_key: OpenAI API key for embeddings
             persist_directory: Optional directory to persist vector store (if None, uses in-memory)
         """
         self.api_key = api_key
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=api_key
-        )
-        
+        self.embeddings = get_shared_embeddings(api_key)
+
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=500,
             chunk_overlap=100,
@@ -75,12 +117,36 @@ class RAGSystem:
         # Temporary directories for persistence (if needed)
         self.cv_persist_dir = None
         self.jd_persist_dir = None
+
+        # Retrieval cache keyed by (query, k_cv, k_jd); safe per-instance
+        # because the indexed content is fixed between (re)index calls, which
+        # invalidate it
+        self._retrieval_cache: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+
+        # Semantic tier: parallel lists of normalized query embeddings, their
+        # (k_cv, k_jd) parameters, and the retrieval results they produced
+        self._semantic_query_vectors: List[np.ndarray] = []
+        self._semantic_query_params: List[Tuple[int, int]] = []
+        self._semantic_query_results: List[Dict[str, Any]] = []
         
         # If persist_directory provided, use it
         if persist_directory:
             self.cv_persist_dir = os.path.join(persist_directory, "cv_vectors")
             self.jd_persist_dir = os.path.join(persist_directory, "jd_vectors")
     
+    def _invalidate_retrieval_caches(self) -> None:
+        """Drop cached retrievals (exact and semantic) after content changes."""
+        self._retrieval_cache.clear()
+        self._semantic_query_vectors = []
+        self._semantic_query_params = []
+        self._semantic_query_results = []
+
+    def _embed_query_normalized(self, query: str) -> np.ndarray:
+        """Embed a query and normalize to unit length for cosine similarity."""
+        vector = np.array(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
     def index_cv(self, cv_text: str, session_id: str = "default") -> Dict[str, Any]:
         """
         Index CV text in vector database.
@@ -93,6 +159,9 @@ class RAGSystem:
             Dictionary with indexing details (chunks_count, total_chars, etc.)
         """
         try:
+            # Indexed content is changing: cached retrievals are stale
+            self._invalidate_retrieval_caches()
+
             # Split text into chunks
             chunks = self.text_splitter.split_text(cv_text)
             
@@ -117,14 +186,16 @@ class RAGSystem:
                 self.cv_vectorstore = Chroma.from_documents(
                     documents=documents,
                     embedding=self.embeddings,
-                    persist_directory=persist_path
+                    persist_directory=persist_path,
+                    collection_metadata=HNSW_INDEX_METADATA
                 )
             else:
                 # In-memory vector store
                 self.cv_vectorstore = Chroma.from_documents(
                     documents=documents,
                     embedding=self.embeddings,
-                    collection_name=f"cv_{session_id}"
+                    collection_name=f"cv_{session_id}",
+                    collection_metadata=HNSW_INDEX_METADATA
                 )
             
             # Return indexing details
@@ -149,6 +220,9 @@ class RAGSystem:
             Dictionary with indexing details (chunks_count, total_chars, etc.)
         """
         try:
+            # Indexed content is changing: cached retrievals are stale
+            self._invalidate_retrieval_caches()
+
             # Split text into chunks
             chunks = self.text_splitter.split_text(jd_text)
             
@@ -173,14 +247,16 @@ class RAGSystem:
                 self.jd_vectorstore = Chroma.from_documents(
                     documents=documents,
                     embedding=self.embeddings,
-                    persist_directory=persist_path
+                    persist_directory=persist_path,
+                    collection_metadata=HNSW_INDEX_METADATA
                 )
             else:
                 # In-memory vector store
                 self.jd_vectorstore = Chroma.from_documents(
                     documents=documents,
                     embedding=self.embeddings,
-                    collection_name=f"jd_{session_id}"
+                    collection_name=f"jd_{session_id}",
+                    collection_metadata=HNSW_INDEX_METADATA
                 )
             
             # Return indexing details
@@ -298,12 +374,40 @@ class RAGSystem:
         Returns:
             Dictionary with 'cv_context', 'jd_context', 'cv_sources', 'jd_sources', 'cv_chunks_details', 'jd_chunks_details'
         """
-        cv_chunks = self.retrieve_from_cv(query, k=k_cv)
-        jd_chunks = self.retrieve_from_jd(query, k=k_jd)
-        
-        # Get chunks with scores for detailed logging
-        cv_chunks_with_scores = self.retrieve_with_scores(query, k=k_cv, source="cv")
-        jd_chunks_with_scores = self.retrieve_with_scores(query, k=k_jd, source="jd")
+        cache_key = (query, k_cv, k_jd)
+        cached = self._retrieval_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Semantic tier: a paraphrase of a previous query reuses its result.
+        # One query embedding is far cheaper than the four the searches below
+        # trigger internally, so the extra embed pays for itself on any hit.
+        query_vector = None
+        try:
+            query_vector = self._embed_query_normalized(query)
+            if self._semantic_query_vectors:
+                similarities = np.stack(self._semantic_query_vectors) @ query_vector
+                best_index = int(np.argmax(similarities))
+                if (similarities[best_index] >= SEMANTIC_QUERY_THRESHOLD
+                        and self._semantic_query_params[best_index] == (k_cv, k_jd)):
+                    return self._semantic_query_results[best_index]
+        except Exception as e:
+            print(f"Semantic retrieval cache lookup failed: {str(e)}")
+            query_vector = None
+
+        # Fan the four searches out concurrently: total retrieval time becomes
+        # the slowest single search instead of the sum of all four
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            cv_future = executor.submit(self.retrieve_from_cv, query, k_cv)
+            jd_future = executor.submit(self.retrieve_from_jd, query, k_jd)
+            # Chunks with scores for detailed logging
+            cv_scores_future = executor.submit(self.retrieve_with_scores, query, k_cv, "cv")
+            jd_scores_future = executor.submit(self.retrieve_with_scores, query, k_jd, "jd")
+
+            cv_chunks = cv_future.result()
+            jd_chunks = jd_future.result()
+            cv_chunks_with_scores = cv_scores_future.result()
+            jd_chunks_with_scores = jd_scores_future.result()
         
         cv_context = "\n\n".join([
             f"[Chunk {i+1}]: {chunk.page_content}"
@@ -339,7 +443,7 @@ class RAGSystem:
             for i, (chunk, score) in enumerate(jd_chunks_with_scores)
         ]
         
-        return {
+        result = {
             "cv_context": cv_context,
             "jd_context": jd_context,
             "cv_sources": cv_sources,
@@ -350,14 +454,32 @@ class RAGSystem:
             "jd_chunks_details": jd_chunks_details,
             "query": query
         }
+
+        if len(self._retrieval_cache) >= RETRIEVAL_CACHE_MAX_ENTRIES:
+            # Simple FIFO eviction, same as the app-level response cache
+            self._retrieval_cache.pop(next(iter(self._retrieval_cache)))
+        self._retrieval_cache[cache_key] = result
+
+        if query_vector is not None:
+            if len(self._semantic_query_vectors) >= SEMANTIC_QUERY_CACHE_MAX_ENTRIES:
+                self._semantic_query_vectors.pop(0)
+                self._semantic_query_params.pop(0)
+                self._semantic_query_results.pop(0)
+            self._semantic_query_vectors.append(query_vector)
+            self._semantic_query_params.append((k_cv, k_jd))
+            self._semantic_query_results.append(result)
+
+        return result
     
     def clear_cv(self) -> None:
         """Clear CV vector store."""
         self.cv_vectorstore = None
-    
+        self._invalidate_retrieval_caches()
+
     def clear_jd(self) -> None:
         """Clear JD vector store."""
         self.jd_vectorstore = None
+        self._invalidate_retrieval_caches()
     
     def clear_all(self) -> None:
         """Clear all vector stores."""
@@ -0,0 +1,122 @@
+"""
+Semantic Cache for CV Optimizer
+Caches responses for near-duplicate (CV, job description) pairs using
+embedding cosine similarity, so a slightly reworded job description
+does not trigger a full agent re-run.
+"""
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from utils.rag_system import get_shared_embeddings
+
+
+class SemanticCache:
+    """
+    Second cache tier below the exact-key response cache.
+
+    Stores one normalized embedding per cached request; a lookup whose
+    cosine similarity to a stored entry exceeds the threshold returns the
+    stored response without invoking the LLM.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.97, max_entries: int = 256):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            similarity_threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of cached entries (FIFO eviction)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+
+        # Parallel lists: vectors[i] is the embedding for responses[i]
+        self.vectors: List[np.ndarray] = []
+        self.params_keys: List[str] = []
+        self.responses: List[Dict[str, Any]] = []
+
+        # Last (text, vector) embedded by lookup, so the store after a miss
+        # reuses it instead of paying for the same embedding twice
+        self._last_embedded: Optional[tuple] = None
+
+    def _embed(self, text: str, api_key: str) -> np.ndarray:
+        """Embed text and normalize to unit length for cosine similarity.
+
+        The embeddings client is keyed by api_key (shared with the RAG
+        system), so each user's texts are embedded on their own key rather
+        than whichever key reached the process-global cache first.
+        """
+        embeddings = get_shared_embeddings(api_key)
+        vector = np.array(embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, cv_text: str, job_description: str, params_key: str, api_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response for a near-duplicate (CV, JD) pair.
+
+        Args:
+            cv_text: CV text
+            job_description: Job description text
+            params_key: Exact-match key for non-text parameters (model, language, ...)
+            api_key: OpenAI API key for embeddings
+
+        Returns:
+            Cached response dictionary, or None on miss
+        """
+        if not self.vectors:
+            return None
+
+        try:
+            text = cv_text + "\n---\n" + job_description
+            query_vector = self._embed(text, api_key)
+            self._last_embedded = (text, query_vector)
+            similarities = np.stack(self.vectors) @ query_vector
+            best_index = int(np.argmax(similarities))
+
+            if (similarities[best_index] >= self.similarity_threshold
+                    and self.params_keys[best_index] == params_key):
+                return self.responses[best_index]
+            return None
+        except Exception as e:
+            print(f"Semantic cache lookup failed: {str(e)}")
+            return None
+
+    def store(self, cv_text: str, job_description: str, params_key: str, api_key: str, response: Dict[str, Any]) -> None:
+        """
+        Store a response for later semantic lookups.
+
+        Args:
+            cv_text: CV text
+            job_description: Job description text
+            params_key: Exact-match key for non-text parameters
+            api_key: OpenAI API key for embeddings
+            response: Response dictionary to cache
+        """
+        try:
+            text = cv_text + "\n---\n" + job_description
+            # Reuse the vector lookup just computed for this same request;
+            # the text comparison keeps a concurrent request's stash from
+            # being stored under the wrong entry
+            last = self._last_embedded
+            if last is not None and last[0] == text:
+                vector = last[1]
+            else:
+                vector = self._embed(text, api_key)
+
+            if len(self.vectors) >= self.max_entries:
+                self.vectors.pop(0)
+                self.params_keys.pop(0)
+                self.responses.pop(0)
+
+            self.vectors.append(vector)
+            self.params_keys.append(params_key)
+            self.responses.append(response)
+        except Exception as e:
+            print(f"Semantic cache store failed: {str(e)}")
+
+    def clear(self) -> None:
+        """Clear all cached entries."""
+        self.vectors = []
+        self.params_keys = []
+        self.responses = []
@@ -3,20 +3,27 @@ Skills Matcher - Extract and match skills between CV and job description
 Uses the tools from tools.py
 """
 from typing import Dict, Any, List
+import numpy as np
 from utils.tools import extract_skills_tool, compare_skills_tool
+from utils.rag_system import get_shared_embeddings
+from utils.fast_ops import pairwise_cosine
+
+# Cosine similarity buckets for embedding-based matching
+MATCH_THRESHOLD = 0.85
+INTERESTING_THRESHOLD = 0.65
 
 
 def extract_skills(text: str, text_type: str, api_key: str, model: str = "gpt-4o-mini", temperature: float = 0.2) -> Dict[str, Any]:
     """
     Extract skills from text (CV or job description).
-    
+
     Args:
         text: The text to analyze
         text_type: "cv" or "job"
         api_key: OpenAI API key
         model: Model to use
         temperature: Temperature for skill extraction (default 0.2)
-    
+
     Returns:
         Dictionary with 'skills' (list) and 'count' (int)
     """
@@ -27,7 +34,7 @@ def extract_skills(text: str, text_type: str, api_key: str, model: str = "gpt-4o
         "model": model,
         "temperature": temperature
     })
-    
+
     return {
         "skills": result.get("skills", []),
         "count": result.get("count", 0),
@@ -35,6 +42,74 @@ def extract_skills(text: str, text_type: str, api_key: str, model: str = "gpt-4o
     }
 
 
+def match_skills_with_embeddings(
+    cv_skills: List[str],
+    job_skills: List[str],
+    api_key: str
+) -> Dict[str, Any]:
+    """
+    Match skills deterministically via embedding cosine similarity.
+
+    One batched embedding call plus a single matrix multiplication replaces
+    the LLM round-trip: pairs above MATCH_THRESHOLD are matched, CV skills
+    whose best similarity lands between INTERESTING_THRESHOLD and
+    MATCH_THRESHOLD are interesting, the rest are cv_only/job_only.
+
+    Args:
+        cv_skills: List of skills from CV
+        job_skills: List of skills from job description
+        api_key: OpenAI API key for embeddings
+
+    Returns:
+        Dictionary with matched, cv_only, job_only, interesting, and stats
+    """
+    try:
+        embeddings = get_shared_embeddings(api_key)
+        all_vectors = np.array(embeddings.embed_documents(cv_skills + job_skills))
+
+        cv_vectors = all_vectors[:len(cv_skills)]
+        jd_vectors = all_vectors[len(cv_skills):]
+        similarity = pairwise_cosine(cv_vectors, jd_vectors)  # [n_cv x n_jd]
+
+        cv_best = similarity.max(axis=1)
+        jd_best = similarity.max(axis=0)
+
+        matched = [cv_skills[i] for i in range(len(cv_skills)) if cv_best[i] >= MATCH_THRESHOLD]
+        interesting = [
+            cv_skills[i] for i in range(len(cv_skills))
+            if INTERESTING_THRESHOLD <= cv_best[i] < MATCH_THRESHOLD
+        ]
+        cv_only = [cv_skills[i] for i in range(len(cv_skills)) if cv_best[i] < INTERESTING_THRESHOLD]
+        job_only = [job_skills[j] for j in range(len(job_skills)) if jd_best[j] < MATCH_THRESHOLD]
+
+        return {
+            "matched": matched,
+            "cv_only": cv_only,
+            "job_only": job_only,
+            "interesting": interesting,
+            "stats": {
+                "total_cv": len(cv_skills),
+                "total_job": len(job_skills),
+                "matched_count": len(matched),
+                "missing_count": len(job_only),
+                "cv_only_count": len(cv_only),
+                "interesting_count": len(interesting),
+                "match_percentage": round((len(matched) / len(job_skills) * 100) if job_skills else 0, 1)
+            },
+            "status": "success"
+        }
+    except Exception as e:
+        return {
+            "matched": [],
+            "cv_only": [],
+            "job_only": [],
+            "interesting": [],
+            "stats": {},
+            "status": "error",
+            "error": str(e)
+        }
+
+
 def match_skills(
     cv_skills: List[str],
     job_skills: List[str],
@@ -42,11 +117,12 @@ def match_skills(
     cv_text: str = "",
     job_text: str = "",
     model: str = "gpt-4o-mini",
-    temperature: float = 0.3
+    temperature: float = 0.3,
+    mode: str = "embeddings"
 ) -> Dict[str, Any]:
     """
     Match CV skills with job description skills.
-    
+
     Args:
         cv_skills: List of skills from CV
         job_skills: List of skills from job description
@@ -55,10 +131,17 @@ def match_skills(
         job_text: Job description text (optional, for context)
         model: Model to use
         temperature: Temperature for skill comparison (default 0.3)
-    
+        mode: "embeddings" (default, deterministic cosine matching) or "llm"
+
     Returns:
         Dictionary with matched, cv_only, job_only, interesting, and stats
     """
+    if mode == "embeddings" and cv_skills and job_skills:
+        result = match_skills_with_embeddings(cv_skills, job_skills, api_key)
+        if result.get("status") == "success":
+            return result
+        # Fall through to the LLM-assisted path on embedding failure
+
     result = compare_skills_tool.invoke({
         "cv_skills": cv_skills,
         "job_skills": job_skills,
@@ -68,5 +151,5 @@ def match_skills(
         "model": model,
         "temperature": temperature
     })
-    
-    return result
\ No newline at end of file
+
+    return result
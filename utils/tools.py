@@ -2,15 +2,30 @@
 Tools for the agents - Functions that can be called by agents
 """
 from langchain_core.tools import tool
+from concurrent.futures import Future
 from typing import List, Dict, Any, Optional
 import json
 import re
-from langchain_openai import ChatOpenAI
+import threading
 from langchain_core.prompts import ChatPromptTemplate
-from sklearn.metrics.pairwise import cosine_similarity
+from utils.hashing import content_hash
+from utils.llm_client import get_chat_model, invoke_with_backoff, truncate_to_tokens
 import numpy as np
+from utils.fast_ops import pairwise_cosine, containment_match_matrix
 from utils.langfuse_config import create_langfuse_callback
 
+# Precompiled once: these run on every LLM response we parse
+_FENCE_JSON_RE = re.compile(r'```json\s*')
+_FENCE_RE = re.compile(r'```\s*')
+_JSON_ARRAY_RE = re.compile(r'\[(.*?)\]', re.DOTALL)
+
+
+def _strip_code_fences(content: str) -> str:
+    """Remove markdown code fences around an LLM JSON response."""
+    content = _FENCE_JSON_RE.sub('', content)
+    content = _FENCE_RE.sub('', content)
+    return content.strip()
+
 
 @tool
 def extract_skills_tool(text: str, text_type: str, api_key: str, model: str = "gpt-4o-mini", temperature: float = 0.2) -> Dict[str, Any]:
@@ -28,13 +43,8 @@ def extract_skills_tool(text: str, text_type: str, api_key: str, model: str = "g
         Dictionary with 'skills' (list of strings) and 'count' (number of skills)
     """
     try:
+        llm = get_chat_model(model, temperature, api_key)
 
-        llm = ChatOpenAI(
-            model=model,
-            temperature=temperature,
-            api_key=api_key
-        )
-        
         if text_type == "cv":
             system_message = """You are an expert at analyzing CVs. Extract the main skills, competencies, and technical abilities from the CV.
 
@@ -79,20 +89,26 @@ Return a JSON array of skills only, no explanations."""
         ])
         
         chain = prompt | llm
-        response = chain.invoke({})
+        response = invoke_with_backoff(chain, {})
         content = response.content.strip()
-        
-        # Parse JSON
-        content = re.sub(r'```json\s*', '', content)
-        content = re.sub(r'```\s*', '', content)
-        content = content.strip()
-        
+
+        # Fast path: the model usually returns the bare JSON array, so try
+        # parsing before paying for fence stripping and regex fallbacks
         try:
             skills = json.loads(content)
             if not isinstance(skills, list):
                 skills = [skills]
         except json.JSONDecodeError:
-            match = re.search(r'\[(.*?)\]', content, re.DOTALL)
+            content = _strip_code_fences(content)
+            try:
+                skills = json.loads(content)
+                if not isinstance(skills, list):
+                    skills = [skills]
+            except json.JSONDecodeError:
+                skills = None
+
+        if skills is None:
+            match = _JSON_ARRAY_RE.search(content)
             if match:
                 array_content = match.group(1)
                 skills = [s.strip().strip('"\'') for s in array_content.split(',')]
@@ -119,6 +135,146 @@ Return a JSON array of skills only, no explanations."""
         }
 
 
+
+# Skill extraction is deterministic for a given text, so repeat extractions
+# on the same CV/JD are pure cache hits (FIFO-bounded). The in-flight table
+# additionally collapses concurrent identical extractions — across sessions —
+# into one LLM call: followers wait on the leader's Future and share it.
+EXTRACT_SKILLS_CACHE_MAX_ENTRIES = 256
+_extract_skills_cache: Dict[tuple, List[str]] = {}
+_extract_inflight: Dict[tuple, Future] = {}
+_extract_inflight_lock = threading.Lock()
+
+
+def cached_extract_skills(text: str, text_type: str, api_key: str, model: str = "gpt-4o-mini") -> List[str]:
+    """
+    Extract skills via extract_skills_tool, caching by content hash.
+
+    Args:
+        text: The text to analyze (CV or job description)
+        text_type: Either "cv" or "job"
+        api_key: OpenAI API key
+        model: Model to use (part of the cache key)
+
+    Returns:
+        List of extracted skills; error results are returned but not cached
+    """
+    key = (text_type, model, content_hash(text.encode("utf-8")))
+    cached = _extract_skills_cache.get(key)
+    if cached is not None:
+        return cached
+
+    with _extract_inflight_lock:
+        future = _extract_inflight.get(key)
+        if future is None:
+            future = Future()
+            _extract_inflight[key] = future
+            is_leader = True
+        else:
+            is_leader = False
+
+    if not is_leader:
+        return future.result()
+
+    try:
+        result = extract_skills_tool.invoke({
+            "text": text,
+            "text_type": text_type,
+            "api_key": api_key,
+            "model": model
+        })
+        skills = result.get("skills", [])
+        if result.get("status") != "error":
+            if len(_extract_skills_cache) >= EXTRACT_SKILLS_CACHE_MAX_ENTRIES:
+                _extract_skills_cache.pop(next(iter(_extract_skills_cache)))
+            _extract_skills_cache[key] = skills
+        future.set_result(skills)
+        return skills
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _extract_inflight_lock:
+            _extract_inflight.pop(key, None)
+
+
+@tool
+def batch_extract_skills_tool(cv_text: str, job_text: str, api_key: str, model: str = "gpt-4o-mini", temperature: float = 0.2) -> Dict[str, Any]:
+    """
+    Extract skills from a CV and a job description in a single LLM call.
+
+    Args:
+        cv_text: The CV text to analyze
+        job_text: The job description text to analyze
+        api_key: OpenAI API key
+        model: Model to use
+        temperature: Temperature for skill extraction (0.0-2.0, default 0.2 for precision)
+
+    Returns:
+        Dictionary with 'cv_skills' and 'job_skills' (lists of strings) and their counts
+    """
+    try:
+        llm = get_chat_model(model, temperature, api_key)
+
+        system_message = """You are an expert at analyzing CVs and job descriptions. Extract the main skills from BOTH texts in one pass.
+
+Return ONLY a JSON object, nothing else. Each skill should be a short, clear term (2-4 words max).
+Focus on technical skills, soft skills, domain expertise, certifications and languages.
+
+Format: {{"cv_skills": ["skill1", ...], "job_skills": ["skill1", ...]}}"""
+
+        prompt_text = f"""Extract all the main skills and competencies from this CV and this job description:
+
+CV:
+{cv_text}
+
+Job Description:
+{job_text}
+
+Return the JSON object only, no explanations."""
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_message),
+            ("human", prompt_text)
+        ])
+
+        chain = prompt | llm
+        response = invoke_with_backoff(chain, {})
+        content = response.content.strip()
+
+        # Fast path first, fence stripping only on failure (as in extract_skills_tool)
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            data = json.loads(_strip_code_fences(content))
+
+        def _clean(skills: Any) -> List[str]:
+            if not isinstance(skills, list):
+                return []
+            skills = [str(skill).strip() for skill in skills if skill and len(str(skill).strip()) > 1]
+            return sorted(set(skills))
+
+        cv_skills = _clean(data.get("cv_skills"))
+        job_skills = _clean(data.get("job_skills"))
+
+        return {
+            "cv_skills": cv_skills,
+            "job_skills": job_skills,
+            "cv_count": len(cv_skills),
+            "job_count": len(job_skills),
+            "status": "success"
+        }
+    except Exception as e:
+        return {
+            "cv_skills": [],
+            "job_skills": [],
+            "cv_count": 0,
+            "job_count": 0,
+            "status": "error",
+            "error": str(e)
+        }
+
+
 @tool
 def compare_skills_tool(cv_skills: List[str], job_skills: List[str], api_key: str, cv_text: str = "", job_text: str = "", model: str = "gpt-4o-mini", temperature: float = 0.3) -> Dict[str, Any]:
     """
@@ -145,32 +301,30 @@ def compare_skills_tool(cv_skills: List[str], job_skills: List[str], api_key: st
         matched = []
         cv_only = []
         job_only = []
-        
-        # Find matches
-        for cv_key, cv_original in cv_normalized.items():
-            found_match = False
-            for job_key, job_original in job_normalized.items():
-                if cv_key == job_key or cv_key in job_key or job_key in cv_key:
-                    matched.append({
-                        "cv_skill": cv_original,
-                        "job_skill": job_original,
-                        "match_type": "exact" if cv_key == job_key else "partial"
-                    })
-                    found_match = True
-                    break
-            
-            if not found_match:
-                cv_only.append(cv_original)
-        
-        # Find job skills not in CV
-        for job_key, job_original in job_normalized.items():
-            found_in_cv = False
-            for cv_key in cv_normalized.keys():
-                if cv_key == job_key or cv_key in job_key or job_key in cv_key:
-                    found_in_cv = True
-                    break
-            if not found_in_cv:
-                job_only.append(job_original)
+
+        # One JIT-compiled pass over the full pairwise matrix replaces both
+        # nested Python loops (CV->job matching and the job-only sweep)
+        cv_keys = list(cv_normalized.keys())
+        job_keys = list(job_normalized.keys())
+        match_matrix = containment_match_matrix(cv_keys, job_keys)
+
+        # Find matches (first matching job skill wins, as before)
+        for i, cv_key in enumerate(cv_keys):
+            hits = np.nonzero(match_matrix[i])[0]
+            if hits.size:
+                j = int(hits[0])
+                matched.append({
+                    "cv_skill": cv_normalized[cv_key],
+                    "job_skill": job_normalized[job_keys[j]],
+                    "match_type": "exact" if match_matrix[i, j] == 2 else "partial"
+                })
+            else:
+                cv_only.append(cv_normalized[cv_key])
+
+        # Find job skills not in CV: their matrix column is all zeros
+        for j, job_key in enumerate(job_keys):
+            if not match_matrix[:, j].any():
+                job_only.append(job_normalized[job_key])
         
         # Use AI to identify interesting CV skills
         interesting = []
@@ -178,16 +332,12 @@ def compare_skills_tool(cv_skills: List[str], job_skills: List[str], api_key: st
             try:
                 # No individual callback - callback from graph level will handle tracing
                 # This ensures all operations create spans under the same trace
-                llm = ChatOpenAI(
-                    model=model,
-                    temperature=temperature,
-                    api_key=api_key
-                )
+                llm = get_chat_model(model, temperature, api_key)
                 
                 prompt_text = f"""Analyze which CV skills from the list below would be valuable or interesting for this job, even though they are not explicitly mentioned in the job description.
 
 Job Description (excerpt):
-{job_text[:1000]}
+{truncate_to_tokens(job_text, 250)}
 
 CV Skills that are NOT in the job description:
 {', '.join(cv_only[:20])}
@@ -204,11 +354,12 @@ Format: ["skill1", "skill2", ...]"""
                 chain = prompt | llm
                 response = chain.invoke({})
                 content = response.content.strip()
-                
-                content = re.sub(r'```json\s*', '', content)
-                content = re.sub(r'```\s*', '', content)
-                content = content.strip()
-                
+
+                try:
+                    json.loads(content)
+                except json.JSONDecodeError:
+                    content = _strip_code_fences(content)
+
                 try:
                     interesting_parsed = json.loads(content)
                     if isinstance(interesting_parsed, list):
@@ -278,13 +429,10 @@ def compare_skills_tool_with_rag(
         and 'interesting' (interesting CV skills)
     """
     try:
-        from langchain_openai import OpenAIEmbeddings
-        
-        # Initialize embeddings
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=api_key
-        )
+        from utils.rag_system import get_shared_embeddings
+
+        # Reuse the shared, batch-configured embeddings client
+        embeddings = get_shared_embeddings(api_key)
         
         # Vectorize skills
         if not cv_skills or not job_skills:
@@ -298,16 +446,15 @@ def compare_skills_tool_with_rag(
                 "error": "Empty skills list"
             }
         
-        # Generate embeddings for skills
-        cv_skill_vectors = embeddings.embed_documents(cv_skills)
-        jd_skill_vectors = embeddings.embed_documents(job_skills)
-        
+        # Generate embeddings for all skills in a single batched API call
+        all_vectors = embeddings.embed_documents(cv_skills + job_skills)
+
         # Convert to numpy arrays
-        cv_vectors = np.array(cv_skill_vectors)
-        jd_vectors = np.array(jd_skill_vectors)
+        cv_vectors = np.array(all_vectors[:len(cv_skills)])
+        jd_vectors = np.array(all_vectors[len(cv_skills):])
         
         # Calculate cosine similarity matrix
-        similarity_matrix = cosine_similarity(cv_vectors, jd_vectors)
+        similarity_matrix = pairwise_cosine(cv_vectors, jd_vectors)
         
         # Find matches above threshold
         matched = []